@@ -1,24 +1,57 @@
 import curses
+import math
 import time
-from . import config, storage, ui, game, menu
-
-GRAPH_SAMPLE_RATE = 0.25
-
-
-def main(stdscr):
+from . import config, storage, ui, game, menu, history, profiling
+
+GRAPH_SAMPLE_RATE = game.GRAPH_SAMPLE_RATE
+COUNTDOWN_TICK = 0.1
+ADAPTIVE_FOCUS = 8
+
+
+def _input_timeout_ms(engine):
+    """Milliseconds getch may block before the next sample or countdown tick."""
+    test_state = engine.state
+    if not test_state["started"]:
+        return -1
+    now = engine.now()
+    deadline = test_state["last_wpm_record_time"] + GRAPH_SAMPLE_RATE
+    if test_state["config"]["mode"] == "time":
+        elapsed = now - test_state["start_time"]
+        next_tick = (int(elapsed / COUNTDOWN_TICK) + 1) * COUNTDOWN_TICK
+        deadline = min(deadline, test_state["start_time"] + next_tick)
+    return max(1, int(math.ceil((deadline - now) * 1000)))
+
+
+def _adaptive_focus(result_store, cfg):
+    """Points an adaptive test at the typist's currently weakest bigrams."""
+    if cfg["mode"] == "adaptive":
+        cfg["focus"] = [
+            (entry["ngram"], entry["score"])
+            for entry in result_store.weak_ngrams(cfg["language"], 2, ADAPTIVE_FOCUS)
+        ]
+
+
+def main(stdscr, profiler=None):
+    profiler = profiler or profiling.NullProfiler()
     curses.curs_set(0)
     storage.ensure_dirs()
     persistent_config = storage.load_config()
     app_config = {
         "language": persistent_config["user_preferences"].get("language", "english"),
         "theme": persistent_config["user_preferences"].get("theme", "default"),
+        "live_stats": persistent_config["user_preferences"].get("live_stats", False),
+        "quote_range": persistent_config["user_preferences"].get(
+            "quote_range", "50-150"
+        ),
         "themes": config.THEMES,
     }
     ui.init_colors(app_config["themes"][app_config["theme"]])
+    result_store = history.ResultStore()
 
     app_state = "MENU"
-    test_state = None
-    menu_handler = menu.Menu(stdscr, app_config)
+    engine = None
+    key_arrival_ns = None
+    menu_handler = menu.Menu(stdscr, app_config, result_store)
 
     while True:
         if app_state == "MENU":
@@ -32,6 +65,9 @@ def main(stdscr):
                     "language"
                 ]
                 persistent_config["user_preferences"]["theme"] = app_config["theme"]
+                persistent_config["user_preferences"]["live_stats"] = app_config[
+                    "live_stats"
+                ]
                 storage.save_config(persistent_config)
                 menu_handler.current_menu = "main"
                 menu_handler.selected_idx = 0
@@ -41,139 +77,75 @@ def main(stdscr):
                     "theme": app_config["theme"],
                     "mode": menu_result.get("mode"),
                     "value": menu_result.get("value"),
+                    "live_stats": app_config["live_stats"],
                 }
-                test_state = game.reset_game(game_cfg)
+                prefs = persistent_config["user_preferences"]
+                if prefs.get("quote_range") != app_config["quote_range"]:
+                    prefs["quote_range"] = app_config["quote_range"]
+                    storage.save_config(persistent_config)
+                _adaptive_focus(result_store, game_cfg)
+                engine = game.Engine(game_cfg, screen_width=stdscr.getmaxyx()[1])
                 app_state = "TEST"
-                stdscr.nodelay(True)
 
         elif app_state == "TEST":
-            current_time = time.time()
-            if test_state["started"]:
-                test_state["time_elapsed"] = current_time - test_state["start_time"]
-            if (
-                test_state["started"]
-                and current_time - test_state["last_wpm_record_time"]
-                >= GRAPH_SAMPLE_RATE
-            ):
-                if test_state["time_elapsed"] > 0:
-                    cumulative_wpm = (test_state["total_typed_chars"] / 5) / (
-                        test_state["time_elapsed"] / 60
-                    )
-                    test_state["wpm_history"].append(
-                        (test_state["time_elapsed"], cumulative_wpm)
-                    )
-                test_state["last_wpm_record_time"] = current_time
-
-            is_over = False
+            test_state = engine.state
             cfg = test_state["config"]
-            if test_state["started"]:
-                if (
-                    cfg.get("value")
-                    and cfg["mode"] == "time"
-                    and test_state["time_elapsed"] >= cfg["value"]
-                ):
-                    is_over = True
-                elif len(test_state["current_text"]) == len(test_state["target_text"]):
-                    is_over = True
-
+            with profiler.phase("tick"):
+                is_over = engine.tick()
             if is_over:
+                profiler.test_finished()
                 test_key = f"{cfg['mode']}_{cfg.get('value', 'na')}_{cfg['language']}"
-                pb_data = storage.get_pb(persistent_config["personal_bests"], test_key)
-                test_state["personal_best"] = pb_data
-
-                results = game.calculate_results(test_state, pb_data)
-                test_state["results"] = results
-
-                if results["is_new_pb"]:
-                    persistent_config["personal_bests"][test_key] = {
-                        "net_wpm": results["net_wpm"],
-                        "acc": results["acc"],
-                        "raw_wpm": results["raw_wpm"],
-                    }
-                    storage.save_config(persistent_config)
+                pb_data = history.best_of(
+                    result_store.personal_best(cfg),
+                    storage.get_pb(persistent_config["personal_bests"], test_key),
+                )
+                results = engine.results(pb_data)
+                results["pb_history"] = result_store.best_history(cfg)
+                result_store.record(
+                    cfg,
+                    results,
+                    target_text=test_state["target_text"],
+                    keylog=test_state["keylog"],
+                )
 
                 app_state = "RESULT"
-                stdscr.nodelay(False)
+                stdscr.timeout(-1)
                 continue
 
-            ui.display_test_ui(stdscr, test_state)
-            key_code = stdscr.getch()
-            if key_code == -1:
+            with profiler.phase("render"):
+                ui.display_test_ui(stdscr, test_state, overlay=profiler.overlay())
+            if key_arrival_ns is not None:
+                profiler.record("latency", time.perf_counter_ns() - key_arrival_ns)
+                key_arrival_ns = None
+            stdscr.timeout(_input_timeout_ms(engine))
+            key = game.read_key(stdscr)
+            if key == -1:
                 continue
 
-            if not test_state["started"]:
-                test_state["started"], test_state["start_time"] = True, time.time()
-                test_state["last_wpm_record_time"] = test_state["start_time"]
-
-            if test_state["test_focus"] == "text":
-                if key_code == ord("\t"):
-                    test_state["test_focus"] = "command"
-                elif key_code in (curses.KEY_BACKSPACE, 127, ord("\b")):
-                    if test_state["current_text"]:
-                        last_char_pos = len(test_state["current_text"]) - 1
-                        test_state["current_text"] = test_state["current_text"][:-1]
-                        if last_char_pos in test_state["extra_chars"]:
-                            del test_state["extra_chars"][last_char_pos]
-                            test_state["line_char_counts"][
-                                test_state["current_line_idx"]
-                            ] -= 1
-
-                elif 32 <= key_code <= 255:
-                    char, pos = chr(key_code), len(test_state["current_text"])
-                    if pos < len(test_state["target_text"]):
-                        test_state["total_typed_chars"] += 1
-                        is_space_expected = test_state["target_text"][pos] == " "
-                        is_space_typed = char == " "
-
-                        if is_space_expected and not is_space_typed:
-                            test_state["errors"] += 1
-                            test_state["extra_chars"][pos] = char
-                            test_state["line_char_counts"][
-                                test_state["current_line_idx"]
-                            ] += 1
-                            test_state["current_text"] += " "
-                        else:
-                            if char != test_state["target_text"][pos]:
-                                test_state["errors"] += 1
-                            test_state["current_text"] += char
-
-            elif test_state["test_focus"] == "command":
-                if key_code == ord("\t"):
-                    next_idx = test_state["selected_command_idx"] + 1
-                    if next_idx >= len(test_state["command_options"]):
-                        test_state["test_focus"] = "text"
-                        test_state["selected_command_idx"] = 0
-                    else:
-                        test_state["selected_command_idx"] = next_idx
-
-                elif key_code == curses.KEY_BTAB:
-                    prev_idx = test_state["selected_command_idx"] - 1
-                    if prev_idx < 0:
-                        test_state["test_focus"] = "text"
-                    else:
-                        test_state["selected_command_idx"] = prev_idx
-
-                elif key_code == 27:
-                    test_state["test_focus"] = "text"
-
-                elif key_code in (curses.KEY_ENTER, 10, 13):
-                    command = test_state["command_options"][
-                        test_state["selected_command_idx"]
-                    ]
-                    if command == "reset":
-                        test_state = game.reset_game(test_state["config"])
-                    elif command == "menu":
-                        app_state = "MENU"
-                        stdscr.nodelay(False)
+            if key == curses.KEY_RESIZE:
+                engine.resize(stdscr.getmaxyx()[1])
+                continue
+
+            key_arrival_ns = time.perf_counter_ns()
+            was_started = test_state["started"]
+            with profiler.phase("input"):
+                command = engine.feed_key(key)
+            if not was_started and test_state["started"]:
+                profiler.test_started()
+            if command == "menu":
+                app_state = "MENU"
+                menu_handler.invalidate()
+                stdscr.timeout(-1)
 
         elif app_state == "RESULT":
-            ui.display_results(stdscr, test_state)
+            ui.display_results(stdscr, engine.state)
             key = stdscr.getch()
             if key == ord("q"):
                 break
             elif key == ord("\t"):
                 app_state = "MENU"
+                menu_handler.invalidate()
             elif key in (curses.KEY_ENTER, 10, 13):
-                test_state = game.reset_game(test_state["config"])
+                _adaptive_focus(result_store, engine.state["config"])
+                engine.reset()
                 app_state = "TEST"
-                stdscr.nodelay(True)
@@ -1,12 +1,416 @@
+import argparse
 import curses
-from . import main
+import os
+import sys
+from . import (
+    main,
+    bench,
+    corpus,
+    export,
+    history,
+    ingest,
+    profiling,
+    race,
+    replay,
+    sampling,
+)
 
-if __name__ == "__main__":
+
+def play(profiler=None):
     try:
-        curses.wrapper(main)
+        curses.wrapper(main, profiler)
     except curses.error as e:
         print("Error initializing the terminal.")
         print("Please ensure your terminal supports colors and is large enough.")
         print(f"Curses error: {e}")
     except KeyboardInterrupt:
         print("\nExiting tttui. Goodbye!")
+    finally:
+        if profiler is not None:
+            print(f"Profile summary written to {profiler.dump()}")
+
+
+def compile_corpus_command(args):
+    if args.output and len(args.files) > 1:
+        sys.exit("tttui compile-corpus: --output needs exactly one input file")
+    for path in args.files:
+        out_path, count = corpus.compile_corpus(path, args.output)
+        print(f"{path}: {count} entries -> {out_path}")
+
+
+def import_command(args):
+    try:
+        out_path, read, written = ingest.import_corpus(
+            args.kind,
+            args.name,
+            args.files,
+            form=args.form,
+            lowercase=args.lowercase,
+            charset=args.charset,
+            min_len=args.min_length,
+            max_len=args.max_length,
+            frequency=args.frequency,
+            append=args.append,
+            encoding=args.encoding,
+            jobs=args.jobs,
+        )
+    except (OSError, LookupError, ValueError) as e:
+        sys.exit(f"tttui import: {e}")
+    print(f"{read} {args.kind} read, {written} written -> {out_path}")
+    if args.compile:
+        compiled, count = corpus.compile_corpus(out_path)
+        print(f"{out_path}: {count} entries -> {compiled}")
+
+
+def stats_command(args):
+    store = history.ResultStore()
+    try:
+        summaries = [
+            summary
+            for summary in store.summaries()
+            if (args.mode is None or summary["mode"] == args.mode)
+            and (args.value is None or str(summary["value"]) == args.value)
+            and (args.language is None or summary["language"] == args.language)
+        ]
+        if summaries:
+            _print_summaries(store, summaries, args)
+        else:
+            print("No matching results recorded yet.")
+        if args.keys:
+            _print_weak_keys(store, args.language or "english")
+    finally:
+        store.close()
+
+
+def _print_summaries(store, summaries, args):
+    header = (
+        f"{'test':<24}{'tests':>7}{'best':>9}{'avg':>9}"
+        f"{f'last {args.last}':>9}{f'best {args.last}':>9}"
+        f"{'p50':>9}{'p90':>9}{'acc':>8}"
+    )
+    print(header)
+    print("-" * len(header))
+    for summary in summaries:
+        rolling = store.rolling_average(summary, args.last)
+        best_recent = store.best_of_last(summary, args.last)
+        print(
+            f"{summary['test_key']:<24}{summary['count']:>7}"
+            f"{summary['best_wpm']:>9.2f}{summary['avg_wpm']:>9.2f}"
+            f"{rolling:>9.2f}{best_recent:>9.2f}"
+            f"{store.percentile(summary, 50):>9.2f}"
+            f"{store.percentile(summary, 90):>9.2f}{summary['avg_acc']:>7.2f}%"
+        )
+        if args.days:
+            for day in store.daily(summary, args.days):
+                print(
+                    f"  {day['day']:<22}{day['count']:>7}{day['best_wpm']:>9.2f}"
+                    f"{day['avg_wpm']:>9.2f}{'':>36}{day['avg_acc']:>7.2f}%"
+                )
+
+
+def export_command(args):
+    store = history.ResultStore()
+    try:
+        count, last_id = export.export(
+            store,
+            args.directory,
+            formats=args.format,
+            chunk_size=args.chunk_rows,
+            after_id=args.after,
+        )
+    except (OSError, RuntimeError) as e:
+        sys.exit(f"tttui export: {e}")
+    finally:
+        store.close()
+    formats = ", ".join(args.format or export.default_formats())
+    print(f"Exported {count} results ({formats}) to {args.directory}.")
+    if count:
+        print(f"Pass --after {last_id} next time to export only newer results.")
+
+
+def _print_weak_keys(store, language):
+    for size, label in ((1, "key"), (2, "bigram")):
+        entries = store.weak_ngrams(language, size)
+        if not entries:
+            continue
+        title = f"weakest {label}s ({language})"
+        print(f"\n{title:<24}{'typed':>7}{'miss':>9}{'ms':>9}")
+        for entry in entries:
+            print(
+                f"  {entry['ngram']!r:<22}{entry['count']:>7}"
+                f"{entry['error_rate'] * 100:>8.1f}%{entry['latency'] * 1e3:>9.0f}"
+            )
+
+
+def replay_command(args):
+    store = history.ResultStore()
+    result = store.get_result(args.id)
+    store.close()
+    if result is None:
+        sys.exit("tttui replay: no such result")
+    if result.get("keystrokes") is None or result["target_text"] is None:
+        sys.exit(f"tttui replay: result {result['id']} has no keystroke log")
+    if args.speed <= 0:
+        sys.exit("tttui replay: --speed must be positive")
+    try:
+        curses.wrapper(replay.replay, result, args.speed)
+    except KeyboardInterrupt:
+        pass
+
+
+def bench_command(args):
+    results = bench.run(
+        mode=args.mode,
+        value=None if args.mode == "quote" else args.value,
+        language=args.language,
+        wpm=args.wpm,
+        accuracy=args.accuracy,
+        tests=args.tests,
+        seed=args.seed,
+        live_stats=args.live_stats,
+    )
+    print(bench.report(results))
+
+
+def _quote_length(value):
+    try:
+        sampling.length_range(value)
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"invalid quote length: {value!r}")
+    return value
+
+
+def serve_command(args):
+    cfg = {"mode": args.mode, "language": args.language}
+    if args.mode == "quote":
+        cfg["value"] = args.length
+    else:
+        cfg["value"] = args.value or (30 if args.mode == "time" else 50)
+    where = args.unix or f"{args.host or '*'}:{args.port}"
+    print(f"Serving {args.mode} races on {where}; Ctrl-C to stop.")
+    race.serve(
+        cfg,
+        host=args.host,
+        port=args.port,
+        unix_path=args.unix,
+        min_players=args.players,
+        tick_rate=args.tick_rate,
+        countdown=args.countdown,
+    )
+
+
+def join_command(args):
+    try:
+        curses.wrapper(race.join, args.host, args.port, args.unix, args.name)
+    except OSError as e:
+        sys.exit(f"tttui join: {e}")
+    except KeyboardInterrupt:
+        pass
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(prog="tttui", description="Terminal typing test.")
+    parser.add_argument(
+        "--profile",
+        action="store_true",
+        help=f"time rendering and input, show an overlay and save a summary"
+        f" (also enabled by {profiling.PROFILE_ENV}=1)",
+    )
+    parser.add_argument(
+        "--cprofile", action="store_true", help="with --profile, cProfile each test"
+    )
+    parser.add_argument(
+        "--tracemalloc",
+        action="store_true",
+        help="with --profile, snapshot allocations of each test",
+    )
+    parser.add_argument(
+        "--profile-dir", default=profiling.PROFILE_DIR, help="where profiles go"
+    )
+    subparsers = parser.add_subparsers(dest="command")
+
+    compile_parser = subparsers.add_parser(
+        "compile-corpus",
+        help="compile word or quote .txt files into memory-mapped .ttc files",
+    )
+    compile_parser.add_argument("files", nargs="+", help="corpus .txt files")
+    compile_parser.add_argument(
+        "-o", "--output", help="output path (only with a single input file)"
+    )
+    compile_parser.set_defaults(func=compile_corpus_command)
+
+    import_parser = subparsers.add_parser(
+        "import", help="build a word or quote list from large text files"
+    )
+    import_parser.add_argument("kind", choices=["words", "quotes"])
+    import_parser.add_argument("name", help="language or quote list to write")
+    import_parser.add_argument("files", nargs="+", help="source text files")
+    import_parser.add_argument(
+        "--frequency",
+        action="store_true",
+        help="sources are 'word count' lines; keep the counts as weights",
+    )
+    import_parser.add_argument(
+        "--form",
+        choices=["NFC", "NFKC", "NFD", "NFKD"],
+        default="NFC",
+        help="Unicode normalization form",
+    )
+    import_parser.add_argument(
+        "--lowercase",
+        action="store_true",
+        default=None,
+        help="lowercase entries (the default for words)",
+    )
+    import_parser.add_argument(
+        "--keep-case",
+        dest="lowercase",
+        action="store_false",
+        help="keep the case of words",
+    )
+    import_parser.add_argument(
+        "--charset",
+        help="only keep entries made of these regex class characters, e.g. a-z'",
+    )
+    import_parser.add_argument("--min-length", type=int, help="shortest entry kept")
+    import_parser.add_argument("--max-length", type=int, help="longest entry kept")
+    import_parser.add_argument(
+        "--append", action="store_true", help="add to the existing list"
+    )
+    import_parser.add_argument("--encoding", default="utf-8", help="source encoding")
+    import_parser.add_argument(
+        "--jobs", type=int, help="worker processes (default: all cores)"
+    )
+    import_parser.add_argument(
+        "--compile", action="store_true", help="also compile the result to .ttc"
+    )
+    import_parser.set_defaults(func=import_command)
+
+    stats_parser = subparsers.add_parser("stats", help="show typing test history")
+    stats_parser.add_argument(
+        "--mode", choices=["time", "words", "quote", "adaptive"]
+    )
+    stats_parser.add_argument(
+        "--value", help="test length filter, e.g. 30 or (for quotes) short"
+    )
+    stats_parser.add_argument("--language", help="language filter")
+    stats_parser.add_argument(
+        "--last", type=int, default=10, help="window for the rolling average"
+    )
+    stats_parser.add_argument(
+        "--days", type=int, default=0, help="also show the last N days per test"
+    )
+    stats_parser.add_argument(
+        "--keys",
+        action="store_true",
+        help="also show the weakest keys and bigrams for --language",
+    )
+    stats_parser.set_defaults(func=stats_command)
+
+    export_parser = subparsers.add_parser(
+        "export", help="export test history to CSV and columnar files"
+    )
+    export_parser.add_argument("directory", help="output directory")
+    export_parser.add_argument(
+        "--format",
+        action="append",
+        choices=sorted(export.WRITERS),
+        help="output format, repeatable (default: csv and arrow if installed,"
+        " else columns)",
+    )
+    export_parser.add_argument(
+        "--after", type=int, default=0, help="only export results with a larger id"
+    )
+    export_parser.add_argument(
+        "--chunk-rows",
+        type=int,
+        default=export.CHUNK_ROWS,
+        help="results read and written at a time",
+    )
+    export_parser.set_defaults(func=export_command)
+
+    replay_parser = subparsers.add_parser("replay", help="play back a recorded test")
+    replay_parser.add_argument(
+        "id", type=int, nargs="?", help="result id (default: the latest test)"
+    )
+    replay_parser.add_argument(
+        "--speed", type=float, default=1.0, help="playback speed multiplier"
+    )
+    replay_parser.set_defaults(func=replay_command)
+
+    bench_parser = subparsers.add_parser(
+        "bench", help="benchmark the engine and renderer with synthetic typing"
+    )
+    bench_parser.add_argument(
+        "--mode", choices=["time", "words", "quote"], default="words"
+    )
+    bench_parser.add_argument("--value", type=int, default=50, help="test length")
+    bench_parser.add_argument("--language", default="english")
+    bench_parser.add_argument("--wpm", type=float, default=90, help="typing speed")
+    bench_parser.add_argument(
+        "--accuracy", type=float, default=0.96, help="share of correct keystrokes"
+    )
+    bench_parser.add_argument("--tests", type=int, default=20, help="tests to run")
+    bench_parser.add_argument("--seed", type=int, default=0)
+    bench_parser.add_argument(
+        "--live-stats", action="store_true", help="render the live stats line"
+    )
+    bench_parser.set_defaults(func=bench_command)
+
+    serve_parser = subparsers.add_parser("serve", help="host typing races")
+    serve_parser.add_argument(
+        "--mode", choices=["time", "words", "quote"], default="words"
+    )
+    serve_parser.add_argument("--value", type=int, help="test length")
+    serve_parser.add_argument(
+        "--length",
+        type=_quote_length,
+        help="quote length for quote races: short, medium, long or MIN-MAX",
+    )
+    serve_parser.add_argument("--language", default="english")
+    serve_parser.add_argument("--host", help="address to listen on (default: all)")
+    serve_parser.add_argument("--port", type=int, default=race.DEFAULT_PORT)
+    serve_parser.add_argument("--unix", help="listen on this Unix socket instead")
+    serve_parser.add_argument(
+        "--players", type=int, default=2, help="players needed to start a race"
+    )
+    serve_parser.add_argument(
+        "--tick-rate", type=float, default=race.TICK_RATE, help="updates per second"
+    )
+    serve_parser.add_argument(
+        "--countdown", type=float, default=race.COUNTDOWN, help="seconds before start"
+    )
+    serve_parser.set_defaults(func=serve_command)
+
+    join_parser = subparsers.add_parser("join", help="join a race server")
+    join_parser.add_argument("host", nargs="?", default="localhost")
+    join_parser.add_argument("--port", type=int, default=race.DEFAULT_PORT)
+    join_parser.add_argument("--unix", help="connect to this Unix socket instead")
+    join_parser.add_argument("--name", help="name shown to other players")
+    join_parser.set_defaults(func=join_command)
+    return parser
+
+
+def run(argv=None):
+    parser = build_parser()
+    args = parser.parse_args(argv)
+    if args.command is None:
+        profile = args.profile or os.environ.get(profiling.PROFILE_ENV) not in (
+            None,
+            "",
+            "0",
+        )
+        profiler = None
+        if profile or args.cprofile or args.tracemalloc:
+            profiler = profiling.Profiler(
+                args.profile_dir,
+                use_cprofile=args.cprofile,
+                use_tracemalloc=args.tracemalloc,
+            )
+        play(profiler)
+        return
+    args.func(args)
+
+
+if __name__ == "__main__":
+    run()
@@ -0,0 +1,141 @@
+import os
+import random
+import struct
+import sys
+from array import array
+
+INDEX_EXT = ".tti"
+MAGIC = b"TTBI"
+VERSION = 1
+_HEADER = struct.Struct("<4sIIIQ")  # magic, version, words, bigrams, source mtime
+# Share of adaptive words drawn from the weak bigrams' postings; the rest
+# come from the normal sampler so the text still reads like the language.
+FOCUS_SHARE = 0.6
+
+
+def bigrams(word):
+    """Returns the distinct bigrams of a word in order of first appearance."""
+    return list(dict.fromkeys(word[i : i + 2] for i in range(len(word) - 1)))
+
+
+class BigramIndex:
+    """Inverted index from every bigram to the ids of the words containing it.
+
+    All posting lists share one array("I"); the words containing keys[i]
+    are postings[offsets[i]:offsets[i + 1]]. source_mtime is the mtime of
+    the corpus it was built from, so a stale index on disk is detected.
+    """
+
+    def __init__(self, keys, offsets, postings, word_count, source_mtime=0):
+        self.keys = keys
+        self.offsets = offsets
+        self.postings = postings
+        self.word_count = word_count
+        self.source_mtime = source_mtime
+        self._slots = {key: i for i, key in enumerate(keys)}
+
+    def __len__(self):
+        return len(self.keys)
+
+    def __contains__(self, bigram):
+        return bigram in self._slots
+
+    @classmethod
+    def build(cls, words, source_mtime=0):
+        """Indexes a word list in one pass."""
+        lists = {}
+        count = 0
+        for word_id, word in enumerate(words):
+            for bigram in bigrams(word):
+                ids = lists.get(bigram)
+                if ids is None:
+                    ids = lists[bigram] = array("I")
+                ids.append(word_id)
+            count += 1
+        keys = sorted(lists)
+        offsets, postings = array("I", [0]), array("I")
+        for key in keys:
+            postings.extend(lists[key])
+            offsets.append(len(postings))
+        return cls(keys, offsets, postings, count, source_mtime)
+
+    def words_with(self, bigram):
+        """Returns the ids of the words containing bigram (empty if none)."""
+        slot = self._slots.get(bigram)
+        if slot is None:
+            return self.postings[:0]
+        return self.postings[self.offsets[slot] : self.offsets[slot + 1]]
+
+    def save(self, path):
+        """Writes the index atomically.
+
+        Layout: header, one pair of uint32 codepoints per bigram, the
+        offsets table and the postings, all little-endian.
+        """
+        codepoints = array("I")
+        for key in self.keys:
+            codepoints.extend((ord(key[0]), ord(key[1])))
+        offsets, postings = array("I", self.offsets), array("I", self.postings)
+        if sys.byteorder == "big":
+            for table in (codepoints, offsets, postings):
+                table.byteswap()
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp_path = path + ".tmp"
+        with open(tmp_path, "wb") as f:
+            f.write(
+                _HEADER.pack(
+                    MAGIC, VERSION, self.word_count, len(self.keys), self.source_mtime
+                )
+            )
+            f.write(codepoints.tobytes())
+            f.write(offsets.tobytes())
+            f.write(postings.tobytes())
+        os.replace(tmp_path, path)
+
+    @classmethod
+    def load(cls, path):
+        """Reads an index written by save(); raises ValueError if it isn't one."""
+        with open(path, "rb") as f:
+            data = f.read()
+        if len(data) < _HEADER.size:
+            raise ValueError(f"{path} is not a tttui bigram index")
+        magic, version, word_count, key_count, mtime = _HEADER.unpack_from(data)
+        if magic != MAGIC or version != VERSION:
+            raise ValueError(f"{path} is not a tttui bigram index")
+        at = _HEADER.size
+        codepoints = array("I", data[at : at + 8 * key_count])
+        at += 8 * key_count
+        offsets = array("I", data[at : at + 4 * (key_count + 1)])
+        at += 4 * (key_count + 1)
+        postings = array("I", data[at:])
+        if sys.byteorder == "big":
+            for table in (codepoints, offsets, postings):
+                table.byteswap()
+        if len(offsets) != key_count + 1 or len(postings) != offsets[-1]:
+            raise ValueError(f"{path} is truncated")
+        keys = [
+            chr(codepoints[i]) + chr(codepoints[i + 1])
+            for i in range(0, len(codepoints), 2)
+        ]
+        return cls(keys, offsets, postings, word_count, mtime)
+
+
+def stream(sampler, index, focus):
+    """Yields words forever, favouring words that contain weak bigrams.
+
+    focus is a list of (bigram, weight) pairs; bigrams missing from the
+    index are ignored, and with none left this is just sampler.stream().
+    """
+    focus = [(bigram, weight) for bigram, weight in focus if bigram in index]
+    if not focus or sum(weight for _, weight in focus) <= 0:
+        yield from sampler.stream()
+        return
+    bigram_list = [bigram for bigram, _ in focus]
+    weights = [weight for _, weight in focus]
+    while True:
+        if random.random() < FOCUS_SHARE:
+            (bigram,) = random.choices(bigram_list, weights)
+            ids = index.words_with(bigram)
+            yield sampler.items[ids[random.randrange(len(ids))]]
+        else:
+            yield sampler.items[sampler.index()]
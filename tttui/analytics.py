@@ -0,0 +1,182 @@
+import math
+from array import array
+
+try:
+    import numpy as np
+except ImportError:  # NumPy is optional; everything has a pure-Python path.
+    np = None
+
+KEY_INCORRECT = 0
+KEY_CORRECT = 1
+KEY_BACKSPACE = 2
+
+
+def moving_average(data, window_size):
+    """Centered moving average with the window clipped at both ends, in O(n).
+
+    Each window sum comes from a prefix-sum table instead of being re-added
+    from scratch for every point.
+    """
+    n = len(data)
+    if not n or window_size <= 1:
+        return list(data)
+    half = window_size // 2
+
+    if np is not None:
+        prefix = np.concatenate(([0.0], np.cumsum(np.asarray(data, dtype=float))))
+        idx = np.arange(n)
+        start = np.maximum(0, idx - half)
+        end = np.minimum(n, idx + half + 1)
+        return ((prefix[end] - prefix[start]) / (end - start)).tolist()
+
+    prefix, running = array("d", [0.0]), 0.0
+    for value in data:
+        running += value
+        prefix.append(running)
+    smoothed = []
+    for i in range(n):
+        start, end = max(0, i - half), min(n, i + half + 1)
+        smoothed.append((prefix[end] - prefix[start]) / (end - start))
+    return smoothed
+
+
+def stdev(data):
+    """Sample standard deviation in a single pass (Welford's algorithm)."""
+    n = len(data)
+    if n < 2:
+        raise ValueError("stdev requires at least two data points")
+    if np is not None:
+        return float(np.std(np.asarray(data, dtype=float), ddof=1))
+    mean, m2 = 0.0, 0.0
+    for count, value in enumerate(data, 1):
+        delta = value - mean
+        mean += delta / count
+        m2 += delta * (value - mean)
+    return math.sqrt(m2 / (n - 1))
+
+
+def keystroke_stats(times, chars, flags):
+    """Derives per-second WPM, error bursts and per-key latency in one pass.
+
+    times holds seconds since the test started, chars the typed codepoints
+    and flags one of KEY_CORRECT, KEY_INCORRECT or KEY_BACKSPACE per entry.
+    """
+    raw_per_second, net_per_second = array("d"), array("d")
+    bursts, burst = [], 0
+    latency_sums, latency_counts = {}, {}
+    prev_time = 0.0
+
+    for t, code, flag in zip(times, chars, flags):
+        second = int(t)
+        while len(raw_per_second) <= second:
+            raw_per_second.append(0.0)
+            net_per_second.append(0.0)
+
+        if flag == KEY_BACKSPACE:
+            prev_time = t
+            continue
+
+        # One keystroke within a second is 1/5 word per 1/60 minute.
+        raw_per_second[second] += 12.0
+        if flag == KEY_CORRECT:
+            net_per_second[second] += 12.0
+            if burst:
+                bursts.append(burst)
+                burst = 0
+        else:
+            burst += 1
+
+        char = chr(code)
+        latency_sums[char] = latency_sums.get(char, 0.0) + (t - prev_time)
+        latency_counts[char] = latency_counts.get(char, 0) + 1
+        prev_time = t
+    if burst:
+        bursts.append(burst)
+
+    return {
+        "raw_wpm_per_second": raw_per_second,
+        "net_wpm_per_second": net_per_second,
+        "error_bursts": len(bursts),
+        "longest_error_burst": max(bursts, default=0),
+        "key_latency": {
+            char: latency_sums[char] / latency_counts[char] for char in latency_sums
+        },
+    }
+
+
+class RollingRate:
+    """Count of events in the last window seconds, updated in O(1).
+
+    Event times live in a ring buffer; read() drops the ones that fell out
+    of the window from the head, so every event is touched at most twice no
+    matter how long the stream runs. The buffer only grows if more than
+    capacity events ever land inside a single window.
+    """
+
+    __slots__ = ("window", "_times", "_head", "_count")
+
+    def __init__(self, window=5.0, capacity=128):
+        self.window = window
+        self._times = array("d", bytes(8 * capacity))
+        self._head = 0
+        self._count = 0
+
+    def __len__(self):
+        return self._count
+
+    def push(self, t):
+        size = len(self._times)
+        if self._count == size:
+            self._times = array(
+                "d",
+                [self._times[(self._head + i) % size] for i in range(size)],
+            ) + array("d", bytes(8 * size))
+            self._head, size = 0, 2 * size
+        self._times[(self._head + self._count) % size] = t
+        self._count += 1
+
+    def pop(self):
+        """Drops the most recent event, e.g. a keystroke that was erased."""
+        if self._count:
+            self._count -= 1
+
+    def read(self, now):
+        """Returns the number of events in (now - window, now]."""
+        times, size, cutoff = self._times, len(self._times), now - self.window
+        while self._count and times[self._head] <= cutoff:
+            self._head = (self._head + 1) % size
+            self._count -= 1
+        return self._count
+
+
+def ngram_stats(target_text, deltas, flags):
+    """Per-character and per-bigram keystroke counters for one test.
+
+    Replays the log against target_text to find the character each
+    keystroke was meant to be. Returns {ngram: [count, errors, latency]},
+    where bigrams are the previous and expected character within a word and
+    latency sums the deltas (as logged) since the previous keystroke.
+    """
+    stats = {}
+    pos, end = 0, len(target_text)
+    for delta, flag in zip(deltas, flags):
+        if flag == KEY_BACKSPACE:
+            pos = max(0, pos - 1)
+            continue
+        if pos >= end:
+            break
+        expected = target_text[pos]
+        if expected != " ":
+            missed = flag != KEY_CORRECT
+            ngrams = [expected]
+            if pos and target_text[pos - 1] != " ":
+                ngrams.append(target_text[pos - 1 : pos + 1])
+            for ngram in ngrams:
+                entry = stats.get(ngram)
+                if entry is None:
+                    entry = stats[ngram] = [0, 0, 0]
+                entry[0] += 1
+                entry[1] += missed
+                entry[2] += delta
+        pos += 1
+    return stats
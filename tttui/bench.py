@@ -0,0 +1,161 @@
+import curses
+import random
+import time
+import tracemalloc
+from . import game, ui
+
+
+class FakeScreen:
+    """Minimal in-memory stand-in for a curses window."""
+
+    def __init__(self, height=40, width=120):
+        self.height, self.width = height, width
+        self.rows = [[" "] * width for _ in range(height)]
+        self.calls = 0
+
+    def getmaxyx(self):
+        return self.height, self.width
+
+    def erase(self):
+        for row in self.rows:
+            row[:] = [" "] * self.width
+
+    def move(self, y, x):
+        self.cursor = (y, x)
+
+    def clrtoeol(self):
+        y, x = self.cursor
+        self.rows[y][x:] = [" "] * (self.width - x)
+
+    def addstr(self, y, x, text, attr=0):
+        self.calls += 1
+        if not (0 <= y < self.height and 0 <= x < self.width):
+            raise curses.error("addstr out of bounds")
+        text = text[: self.width - x]
+        self.rows[y][x : x + len(text)] = text
+
+    def noutrefresh(self):
+        pass
+
+    def refresh(self):
+        pass
+
+
+class SyntheticClock:
+    """Nanosecond clock that only moves when the typist does."""
+
+    def __init__(self):
+        self.now_ns = 0
+
+    def __call__(self):
+        return self.now_ns
+
+    def advance(self, seconds):
+        self.now_ns += int(seconds * 1e9)
+
+
+def keystrokes(engine, wpm, accuracy, rng):
+    """Yields (delay in seconds, key) for a typist at wpm and accuracy.
+
+    Mistakes are typed as a wrong letter followed by a backspace.
+    """
+    mean_delay = 60 / (wpm * 5)
+    state = engine.state
+    while True:
+        pos = len(state["typed"])
+        if pos >= len(state["target_text"]):
+            return
+        delay = rng.expovariate(1 / mean_delay)
+        if rng.random() > accuracy:
+            yield delay, rng.choice("qxzjv")
+            yield rng.expovariate(1 / mean_delay), 127
+            continue
+        yield delay, state["target_text"][pos]
+
+
+def run_test(cfg, wpm, accuracy, rng, screen, frame_times):
+    """Types one synthetic test to the end; returns (keystrokes, engine ns)."""
+    clock = SyntheticClock()
+    engine = game.Engine(cfg, clock_ns=clock, screen_width=screen.width)
+    count, engine_ns = 0, 0
+    ui.display_test_ui(screen, engine.state)
+    for delay, key in keystrokes(engine, wpm, accuracy, rng):
+        clock.advance(delay)
+        start = time.perf_counter_ns()
+        engine.feed_key(key)
+        is_over = engine.tick()
+        engine_ns += time.perf_counter_ns() - start
+        count += 1
+
+        start = time.perf_counter_ns()
+        ui.display_test_ui(screen, engine.state)
+        frame_times.append(time.perf_counter_ns() - start)
+        if is_over:
+            break
+    engine.results()
+    return count, engine_ns
+
+
+def _percentile(sorted_values, pct):
+    return sorted_values[min(len(sorted_values) - 1, int(pct / 100 * len(sorted_values)))]
+
+
+def run(
+    mode="words",
+    value=50,
+    language="english",
+    wpm=90,
+    accuracy=0.96,
+    tests=20,
+    seed=0,
+    live_stats=False,
+):
+    """Runs the benchmark and returns a dict of measurements."""
+    ui.set_headless(True)
+    rng = random.Random(seed)
+    random.seed(seed)
+    cfg = {"mode": mode, "value": value, "language": language, "live_stats": live_stats}
+    screen = FakeScreen()
+    frame_times, total_keys, total_engine_ns = [], 0, 0
+    for _ in range(tests):
+        count, engine_ns = run_test(cfg, wpm, accuracy, rng, screen, frame_times)
+        total_keys += count
+        total_engine_ns += engine_ns
+
+    tracemalloc.start()
+    before = tracemalloc.take_snapshot()
+    run_test(cfg, wpm, accuracy, rng, FakeScreen(), [])
+    after = tracemalloc.take_snapshot()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    stats = after.compare_to(before, "filename")
+    allocated_blocks = sum(max(0, stat.count_diff) for stat in stats)
+
+    frame_times.sort()
+    return {
+        "tests": tests,
+        "keystrokes": total_keys,
+        "keystrokes_per_second": total_keys / (total_engine_ns / 1e9)
+        if total_engine_ns
+        else 0,
+        "frame_mean_us": sum(frame_times) / len(frame_times) / 1e3 if frame_times else 0,
+        "frame_p50_us": _percentile(frame_times, 50) / 1e3 if frame_times else 0,
+        "frame_p99_us": _percentile(frame_times, 99) / 1e3 if frame_times else 0,
+        "addstr_per_frame": screen.calls / max(1, len(frame_times)),
+        "retained_blocks_per_test": allocated_blocks,
+        "peak_kib_per_test": peak / 1024,
+    }
+
+
+def report(results):
+    lines = [
+        f"tests                 {results['tests']}",
+        f"keystrokes            {results['keystrokes']}",
+        f"engine keystrokes/s   {results['keystrokes_per_second']:,.0f}",
+        f"frame mean            {results['frame_mean_us']:.1f} us",
+        f"frame p50 / p99       {results['frame_p50_us']:.1f} / {results['frame_p99_us']:.1f} us",
+        f"addstr calls/frame    {results['addstr_per_frame']:.1f}",
+        f"retained blocks/test  {results['retained_blocks_per_test']}",
+        f"peak memory/test      {results['peak_kib_per_test']:.1f} KiB",
+    ]
+    return "\n".join(lines)
@@ -0,0 +1,140 @@
+import mmap
+import os
+import struct
+import sys
+from array import array
+from collections.abc import Sequence
+
+COMPILED_EXT = ".ttc"
+MAGIC = b"TTUC"
+VERSION = 2
+FLAG_WEIGHTED = 1
+_HEADER = struct.Struct("<4sIII")
+_OFFSET = struct.Struct("<I")
+_WEIGHT_SIZE = 8
+
+
+def compiled_path(txt_path):
+    """Returns the compiled corpus path that sits next to a .txt corpus."""
+    return os.path.splitext(txt_path)[0] + COMPILED_EXT
+
+
+def read_lines(txt_path):
+    """Yields the stripped, non-empty lines of a plain-text corpus."""
+    with open(txt_path, "r", encoding="utf-8") as f:
+        for line in f:
+            line = line.strip()
+            if line:
+                yield line
+
+
+def _split_weight(line):
+    parts = line.split()
+    if len(parts) != 2:
+        return None
+    try:
+        weight = float(parts[1])
+    except ValueError:
+        return None
+    return (parts[0], weight) if weight >= 0 else None
+
+
+def is_weighted(lines):
+    """Returns whether corpus lines are all ``word frequency`` pairs.
+
+    Stops at the first line that isn't, so a plain list is rejected early;
+    None if there are no lines at all.
+    """
+    empty = True
+    for line in lines:
+        if _split_weight(line) is None:
+            return False
+        empty = False
+    return None if empty else True
+
+
+def parse_entries(lines):
+    """Splits corpus lines into items and optional frequency weights.
+
+    A corpus is weighted only if every line is ``word frequency``; otherwise
+    each whole line is an item (quotes, plain wordlists) and weights is None.
+    """
+    lines = tuple(lines)
+    split = [_split_weight(line) for line in lines]
+    if not split or None in split:
+        return lines, None
+    return tuple(word for word, _ in split), array("d", (w for _, w in split))
+
+
+def compile_corpus(txt_path, out_path=None):
+    """Compiles a .txt corpus into an offsets table plus a UTF-8 blob.
+
+    Layout: header (magic, version, count, flags), count + 1 little-endian
+    uint32 byte offsets into the blob, count float64 weights if the corpus
+    is weighted, then the blob itself. Returns the output path and the
+    number of entries.
+    """
+    out_path = out_path or compiled_path(txt_path)
+    items, weights = parse_entries(read_lines(txt_path))
+    offsets, blob = array("I", [0]), bytearray()
+    for item in items:
+        blob += item.encode("utf-8")
+        offsets.append(len(blob))
+
+    flags = FLAG_WEIGHTED if weights is not None else 0
+    if sys.byteorder == "big":
+        offsets.byteswap()
+        if weights is not None:
+            weights.byteswap()
+    tmp_path = out_path + ".tmp"
+    with open(tmp_path, "wb") as f:
+        f.write(_HEADER.pack(MAGIC, VERSION, len(items), flags))
+        f.write(offsets.tobytes())
+        if weights is not None:
+            f.write(weights.tobytes())
+        f.write(blob)
+    os.replace(tmp_path, out_path)
+    return out_path, len(items)
+
+
+class CompiledCorpus(Sequence):
+    """Read-only, memory-mapped view of a compiled corpus.
+
+    Entries are decoded on access, so sampling a few words only touches the
+    pages holding their offsets and bytes, and processes mapping the same
+    file share the page cache.
+    """
+
+    def __init__(self, path):
+        with open(path, "rb") as f:
+            self._mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, version, count, flags = _HEADER.unpack_from(self._mm, 0)
+        if magic != MAGIC or version != VERSION:
+            self._mm.close()
+            raise ValueError(f"{path} is not a compiled tttui corpus")
+        self._count = count
+        self._offsets_at = _HEADER.size
+        weights_at = _HEADER.size + (count + 1) * _OFFSET.size
+        self._blob_at = weights_at
+        self.weights = None
+        if flags & FLAG_WEIGHTED:
+            self._blob_at += count * _WEIGHT_SIZE
+            self.weights = array("d", self._mm[weights_at : self._blob_at])
+            if sys.byteorder == "big":
+                self.weights.byteswap()
+
+    def __len__(self):
+        return self._count
+
+    def _offset(self, idx):
+        return _OFFSET.unpack_from(self._mm, self._offsets_at + idx * _OFFSET.size)[0]
+
+    def __getitem__(self, idx):
+        if isinstance(idx, slice):
+            return [self[i] for i in range(*idx.indices(self._count))]
+        if idx < 0:
+            idx += self._count
+        if not 0 <= idx < self._count:
+            raise IndexError("corpus index out of range")
+        start, end = self._offset(idx), self._offset(idx + 1)
+        return self._mm[self._blob_at + start : self._blob_at + end].decode("utf-8")
@@ -0,0 +1,245 @@
+import csv
+import json
+import os
+import sys
+from array import array
+from . import history
+
+try:
+    import pyarrow as pa
+    import pyarrow.ipc
+except ImportError:  # Arrow is optional; without it columns go to plain files.
+    pa = None
+
+CHUNK_ROWS = 4096
+# Scalar result columns and their array typecodes; None marks a string.
+COLUMNS = (
+    ("id", "q"),
+    ("timestamp", "d"),
+    ("mode", None),
+    ("value", None),
+    ("language", None),
+    ("net_wpm", "d"),
+    ("raw_wpm", "d"),
+    ("acc", "d"),
+    ("consistency", "d"),
+    ("time", "d"),
+    ("char_stats", None),
+)
+_TYPE_NAMES = {"q": "int64", "d": "float64", None: "utf8"}
+
+
+def _text(value):
+    return None if value is None else str(value)
+
+
+def _little_endian(table):
+    if sys.byteorder == "big":
+        table.byteswap()
+    return table
+
+
+class _Output:
+    """Files written under a temporary name and renamed into place on commit."""
+
+    def __init__(self, out_dir):
+        self.out_dir = out_dir
+        self.files = {}
+
+    def open(self, name, mode="wb"):
+        tmp_path = os.path.join(self.out_dir, name + ".tmp")
+        if "b" in mode:
+            f = open(tmp_path, mode)
+        else:
+            f = open(tmp_path, mode, encoding="utf-8", newline="")
+        self.files[name] = f
+        return f
+
+    def commit(self):
+        for name, f in self.files.items():
+            f.close()
+            os.replace(f.name, os.path.join(self.out_dir, name))
+
+    def abort(self):
+        for f in self.files.values():
+            f.close()
+            os.remove(f.name)
+
+
+class CsvWriter(_Output):
+    """results.csv with one row per test, wpm_samples.csv with one per sample."""
+
+    def __init__(self, out_dir):
+        super().__init__(out_dir)
+        self.results = csv.writer(self.open("results.csv", "w"))
+        self.results.writerow([name for name, _ in COLUMNS] + ["samples"])
+        self.samples = self.open("wpm_samples.csv", "w")
+        self.samples.write("result_id,sample,wpm\r\n")
+
+    def write(self, rows):
+        for row in rows:
+            samples = history.unpack_samples(row["wpm_history"])
+            self.results.writerow([row[name] for name, _ in COLUMNS] + [len(samples)])
+            # All numeric, so nothing needs quoting: skip the csv module,
+            # which costs several times more on these millions of rows.
+            result_id = row["id"]
+            self.samples.write(
+                "".join(
+                    f"{result_id},{i},{wpm!r}\r\n"
+                    for i, wpm in enumerate(samples)
+                )
+            )
+
+
+class ColumnWriter(_Output):
+    """One little-endian file per column under columns/, plus schema.json.
+
+    Numeric columns are raw arrays. A string column is a .utf8 blob with
+    a uint64 .offsets file (rows + 1 entries, null stored as ""), and
+    wpm_history is a float64 .f64 file with the same kind of offsets,
+    counted in samples. Anything numpy.fromfile or a warehouse loader
+    can map without parsing.
+    """
+
+    def __init__(self, out_dir):
+        out_dir = os.path.join(out_dir, "columns")
+        os.makedirs(out_dir, exist_ok=True)
+        super().__init__(out_dir)
+        self.rows = 0
+        self.blob_sizes = {}
+        for name, typecode in COLUMNS:
+            if typecode is None:
+                self.open(name + ".utf8")
+                self._start_offsets(name)
+            else:
+                self.open(f"{name}.{typecode}")
+        self.open("wpm_history.f64")
+        self._start_offsets("wpm_history")
+
+    def _start_offsets(self, name):
+        self.open(name + ".offsets").write(_little_endian(array("Q", [0])).tobytes())
+        self.blob_sizes[name] = 0
+
+    def _write_offsets(self, name, sizes):
+        offsets, total = array("Q"), self.blob_sizes[name]
+        for size in sizes:
+            total += size
+            offsets.append(total)
+        self.blob_sizes[name] = total
+        self.files[name + ".offsets"].write(_little_endian(offsets).tobytes())
+
+    def write(self, rows):
+        self.rows += len(rows)
+        for name, typecode in COLUMNS:
+            if typecode is None:
+                blobs = [(_text(row[name]) or "").encode("utf-8") for row in rows]
+                self.files[name + ".utf8"].write(b"".join(blobs))
+                self._write_offsets(name, map(len, blobs))
+            else:
+                column = _little_endian(array(typecode, (row[name] for row in rows)))
+                self.files[f"{name}.{typecode}"].write(column.tobytes())
+        # Stored samples are already little-endian float64; copy them as-is.
+        blobs = [row["wpm_history"] for row in rows]
+        self.files["wpm_history.f64"].write(b"".join(blobs))
+        self._write_offsets("wpm_history", (len(blob) // 8 for blob in blobs))
+
+    def commit(self):
+        columns = [
+            {
+                "name": name,
+                "type": _TYPE_NAMES[typecode],
+                "files": [name + ".utf8", name + ".offsets"]
+                if typecode is None
+                else [f"{name}.{typecode}"],
+            }
+            for name, typecode in COLUMNS
+        ]
+        columns.append(
+            {
+                "name": "wpm_history",
+                "type": "list<float64>",
+                "files": ["wpm_history.f64", "wpm_history.offsets"],
+            }
+        )
+        schema = {"rows": self.rows, "byteorder": "little", "columns": columns}
+        json.dump(schema, self.open("schema.json", "w"), indent=2)
+        super().commit()
+
+
+class ArrowWriter(_Output):
+    """results.arrow, an Arrow IPC file with one record batch per chunk."""
+
+    def __init__(self, out_dir):
+        super().__init__(out_dir)
+        types = {"q": pa.int64(), "d": pa.float64(), None: pa.string()}
+        self.schema = pa.schema(
+            [(name, types[typecode]) for name, typecode in COLUMNS]
+            + [("wpm_history", pa.list_(pa.float64()))]
+        )
+        self.writer = pa.ipc.new_file(self.open("results.arrow"), self.schema)
+
+    def write(self, rows):
+        arrays = []
+        for name, typecode in COLUMNS:
+            values = [row[name] for row in rows]
+            if typecode is None:
+                values = [_text(value) for value in values]
+            arrays.append(pa.array(values, self.schema.field(name).type))
+        offsets, samples = array("i", [0]), array("d")
+        for row in rows:
+            samples.extend(history.unpack_samples(row["wpm_history"]))
+            offsets.append(len(samples))
+        arrays.append(
+            pa.ListArray.from_arrays(
+                pa.array(offsets, pa.int32()), pa.array(samples, pa.float64())
+            )
+        )
+        self.writer.write_batch(pa.record_batch(arrays, schema=self.schema))
+
+    def commit(self):
+        self.writer.close()
+        super().commit()
+
+    def abort(self):
+        self.writer.close()
+        super().abort()
+
+
+WRITERS = {"csv": CsvWriter, "columns": ColumnWriter, "arrow": ArrowWriter}
+
+
+def default_formats():
+    """CSV plus Arrow when pyarrow is installed, plain column files otherwise."""
+    return ["csv", "arrow" if pa is not None else "columns"]
+
+
+def export(store, out_dir, formats=None, chunk_size=CHUNK_ROWS, after_id=0):
+    """Streams the results after after_id from a ResultStore into out_dir.
+
+    Rows are fetched and written chunk_size at a time by every writer, so
+    memory stays bounded however long the history is. Each file appears
+    under its final name only once all of it is written. Returns (rows
+    exported, last id), the last id being the after_id of the next
+    incremental export.
+    """
+    formats = formats or default_formats()
+    if "arrow" in formats and pa is None:
+        raise RuntimeError("Arrow export needs pyarrow; use the columns format")
+    os.makedirs(out_dir, exist_ok=True)
+    writers = []
+    try:
+        for name in formats:
+            writers.append(WRITERS[name](out_dir))
+        count, last_id = 0, after_id
+        for rows in store.iter_results(chunk_size, after_id):
+            for writer in writers:
+                writer.write(rows)
+            count += len(rows)
+            last_id = rows[-1]["id"]
+    except BaseException:
+        for writer in writers:
+            writer.abort()
+        raise
+    for writer in writers:
+        writer.commit()
+    return count, last_id
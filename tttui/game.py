@@ -1,39 +1,104 @@
-import random
-import statistics
-from . import storage
+import curses
+import itertools
+import time
+from array import array
+from . import adaptive, analytics, keylog, layout, storage
+from .cells import char_width
 
 
-def reset_game(config):
-    """Initializes a new game state with performance tracking."""
+class TypedBuffer:
+    """Typed characters with O(1) append/pop and a per-position correctness map."""
+
+    __slots__ = ("chars", "correct")
+
+    def __init__(self):
+        self.chars = []
+        self.correct = bytearray()
+
+    def __len__(self):
+        return len(self.chars)
+
+    def __getitem__(self, pos):
+        return self.chars[pos]
+
+    def append(self, char, is_correct):
+        self.chars.append(char)
+        self.correct.append(is_correct)
+
+    def pop(self):
+        self.correct.pop()
+        return self.chars.pop()
+
+    def is_correct(self, pos):
+        return bool(self.correct[pos])
+
+
+GRAPH_SAMPLE_RATE = 0.25
+ROLLING_WINDOW = 5.0
+LINE_WIDTH = 80
+LOOKAHEAD_LINES = 3
+
+
+def extend_lines(state, line_count=None):
+    """Wraps more target text until line_count lines exist (all of it if None)."""
+    state["layout"].extend(line_count)
+    state["target_text"] = state["layout"].text
+
+
+def relayout(state, screen_width):
+    """Re-wraps from the caret's line onward after the terminal was resized."""
+    state["layout"].relayout(
+        state["current_line_idx"],
+        layout.line_width_for(screen_width),
+        state["extra_chars"],
+    )
+    state["target_text"] = state["layout"].text
+    _follow_caret(state)
+
+
+def reset_game(config, target_text=None, screen_width=None):
+    """Initializes a new game state with performance tracking.
+
+    A fixed target_text (e.g. from a stored result being replayed) is used
+    as-is instead of drawing new words. Quote mode picks a quote whose
+    length matches config["value"] (see sampling.length_range). Adaptive
+    mode favours words with the (bigram, weight) pairs in config["focus"].
+    Lines are wrapped to fit screen_width, or to LINE_WIDTH when no screen
+    is known.
+    """
     language = config.get("language", "english")
     mode = config["mode"]
 
-    if mode == "quote":
-        items = storage.load_items("quotes", language)
-        target_text = random.choice(items) if items else "No quotes found."
+    if target_text is not None:
+        words = target_text.split(" ")
+    elif mode == "quote":
+        quote = storage.load_quote_index(language).choice(config.get("value"))
+        words = (quote or "No quotes of that length found.").split(" ")
     else:
-        items = storage.load_items("words", language)
-        random.shuffle(items)
+        sampler = storage.load_sampler("words", language)
         if mode == "time":
-            target_text = " ".join(items * 10)
-        else:
-            target_text = " ".join(items[: config.get("value", 25)])
-
-    lines, current_line, line_width = [], "", 80
-    for word in target_text.split(" "):
-        if len(current_line) + len(word) + 1 > line_width:
-            lines.append(current_line)
-            current_line = word
+            words = sampler.stream()
+        elif mode == "adaptive":
+            words = itertools.islice(
+                adaptive.stream(
+                    sampler,
+                    storage.load_bigram_index(language),
+                    config.get("focus", ()),
+                ),
+                config.get("value", 25),
+            )
         else:
-            current_line += (" " if current_line else "") + word
-    lines.append(current_line)
+            words = sampler.sample(config.get("value", 25))
 
-    return {
+    state = {
         "config": config,
-        "target_text": target_text,
-        "lines": lines,
+        "target_text": "",
+        "layout": layout.Layout(
+            words,
+            LINE_WIDTH if screen_width is None else layout.line_width_for(screen_width),
+        ),
         "current_line_idx": 0,
-        "current_text": "",
+        "typed": TypedBuffer(),
         "start_time": 0,
         "time_elapsed": 0,
         "started": False,
@@ -43,10 +108,75 @@ def reset_game(config):
         "total_typed_chars": 0,
         "errors": 0,
         "extra_chars": {},
-        "line_char_counts": [len(line) for line in lines],
         "wpm_history": [],
+        "net_history": array("d"),
+        "keylog": keylog.KeyLog(),
+        "rolling": analytics.RollingRate(ROLLING_WINDOW),
         "last_wpm_record_time": 0,
+        "view": None,
     }
+    lazy = mode == "time" and target_text is None
+    extend_lines(state, LOOKAHEAD_LINES if lazy else None)
+    return state
+
+
+def backspace(state, now_ns=None):
+    """Removes the last typed character, undoing any extra char it carried."""
+    if not state["typed"]:
+        return
+    state["keylog"].record("\b", analytics.KEY_BACKSPACE, now_ns)
+    last_char_pos = len(state["typed"]) - 1
+    if last_char_pos in state["extra_chars"]:
+        # Stored as a correct space for display, but never pushed to rolling.
+        state["layout"].extras[line_index(state, last_char_pos)] -= char_width(
+            state["extra_chars"].pop(last_char_pos)
+        )
+    elif state["typed"].is_correct(last_char_pos):
+        state["rolling"].pop()
+    state["typed"].pop()
+    _follow_caret(state)
+
+
+def type_char(state, char, now_ns=None):
+    """Applies one typed character to the test state."""
+    pos = len(state["typed"])
+    if pos >= len(state["target_text"]):
+        return
+    if now_ns is None:
+        now_ns = time.perf_counter_ns()
+    state["total_typed_chars"] += 1
+    is_space_expected = state["target_text"][pos] == " "
+    is_space_typed = char == " "
+
+    if is_space_expected and not is_space_typed:
+        state["keylog"].record(char, analytics.KEY_INCORRECT, now_ns)
+        state["errors"] += 1
+        state["extra_chars"][pos] = char
+        state["layout"].extras[line_index(state, pos)] += char_width(char)
+        state["typed"].append(" ", True)
+    else:
+        is_correct = char == state["target_text"][pos]
+        state["keylog"].record(
+            char,
+            analytics.KEY_CORRECT if is_correct else analytics.KEY_INCORRECT,
+            now_ns,
+        )
+        if is_correct:
+            state["rolling"].push(now_ns / 1e9)
+        else:
+            state["errors"] += 1
+        state["typed"].append(char, is_correct)
+    _follow_caret(state)
+
+
+def _follow_caret(state):
+    state["current_line_idx"] = line_index(state, len(state["typed"]))
+    extend_lines(state, state["current_line_idx"] + LOOKAHEAD_LINES)
+
+
+def line_index(state, pos):
+    """Returns the index of the wrapped line containing text position pos."""
+    return state["layout"].line_index(pos)
 
 
 def calculate_results(state, personal_best):
@@ -59,16 +189,16 @@ def calculate_results(state, personal_best):
     net_wpm = (correct_chars / 5) / (time_elapsed / 60) if time_elapsed > 0 else 0
     raw_wpm = (total_typed / 5) / (time_elapsed / 60) if time_elapsed > 0 else 0
     accuracy = (correct_chars / total_typed) * 100 if total_typed > 0 else 0
-    wpm_values = [wpm for time, wpm in state["wpm_history"]]
+    wpm_values = array("d", (wpm for time, wpm in state["wpm_history"]))
     consistency = (
-        (100 - statistics.stdev(wpm_values) / net_wpm * 100)
+        (100 - analytics.stdev(wpm_values) / net_wpm * 100)
         if len(wpm_values) > 1 and net_wpm > 0
         else 100
     )
 
     is_new_pb = not personal_best or net_wpm > personal_best["net_wpm"]
 
-    char_stats = f"{correct_chars}/{errors}/{len(state['target_text']) - len(state['current_text'])}"
+    char_stats = f"{correct_chars}/{errors}/{len(state['target_text']) - len(state['typed'])}"
 
     return {
         "net_wpm": net_wpm,
@@ -77,6 +207,166 @@ def calculate_results(state, personal_best):
         "time": time_elapsed,
         "consistency": max(0, consistency),
         "wpm_history": wpm_values,
+        "net_history": state["net_history"],
         "char_stats": char_stats,
+        "keystrokes": analytics.keystroke_stats(
+            state["keylog"].times(), state["keylog"].chars, state["keylog"].flags
+        ),
         "is_new_pb": is_new_pb,
     }
+
+
+def live_stats(state):
+    """Net/raw WPM, accuracy and rolling net WPM so far, in O(1).
+
+    The rolling figure counts the correct keystrokes of the last
+    ROLLING_WINDOW seconds (or of the whole test while it is shorter).
+    """
+    elapsed = state["time_elapsed"]
+    if not state["started"] or elapsed <= 0:
+        return {"net_wpm": 0.0, "raw_wpm": 0.0, "acc": 100.0, "rolling_wpm": 0.0}
+    total_typed = state["total_typed_chars"]
+    correct_chars = total_typed - state["errors"]
+    recent = state["rolling"].read(state["start_time"] + elapsed)
+    return {
+        "net_wpm": (correct_chars / 5) / (elapsed / 60),
+        "raw_wpm": (total_typed / 5) / (elapsed / 60),
+        "acc": correct_chars / total_typed * 100 if total_typed else 100.0,
+        "rolling_wpm": (recent / 5) / (min(elapsed, ROLLING_WINDOW) / 60),
+    }
+
+
+def read_key(window):
+    """Reads one key with get_wch, so multibyte input arrives whole.
+
+    Returns -1 if the window's timeout expired without input.
+    """
+    try:
+        return window.get_wch()
+    except curses.error:
+        return -1
+
+
+def normalize_key(key):
+    """Maps getch codes and get_wch results to a typed str or a key code.
+
+    Printable characters come back as a str; control characters and
+    curses KEY_* codes as an int.
+    """
+    if isinstance(key, str):
+        code = ord(key)
+        return code if code < 32 or code == 127 else key
+    if 32 <= key <= 255 and key != 127:
+        return chr(key)
+    return key
+
+
+class Engine:
+    """Curses-free driver for one typing test.
+
+    Wraps the reset_game/calculate_results state dict: feed_key applies a
+    getch key code, tick advances the clock and WPM sampling, and results
+    scores the finished test. clock_ns defaults to time.perf_counter_ns and
+    can be replaced by a synthetic clock for headless runs.
+    """
+
+    def __init__(self, config, clock_ns=None, target_text=None, screen_width=None):
+        self.clock_ns = clock_ns or time.perf_counter_ns
+        self.screen_width = screen_width
+        self.state = reset_game(config, target_text, screen_width)
+
+    def now(self):
+        return self.clock_ns() / 1e9
+
+    def reset(self):
+        self.state = reset_game(self.state["config"], screen_width=self.screen_width)
+        return self.state
+
+    def resize(self, screen_width):
+        """Re-wraps the remaining text for a new terminal width."""
+        if screen_width != self.screen_width:
+            self.screen_width = screen_width
+            relayout(self.state, screen_width)
+
+    def start(self, now_ns=None):
+        """Starts the test clock; normally the first key does this."""
+        state = self.state
+        now_ns = self.clock_ns() if now_ns is None else now_ns
+        state["started"], state["start_time"] = True, now_ns / 1e9
+        state["last_wpm_record_time"] = state["start_time"]
+        state["keylog"].start(now_ns)
+
+    def feed_key(self, key):
+        """Applies one key; returns the name of a command if one ran.
+
+        key is a getch code or a get_wch result (a str for typed characters,
+        including wide ones).
+        """
+        key_code = normalize_key(key)
+        state = self.state
+        now_ns = self.clock_ns()
+        if not state["started"]:
+            self.start(now_ns)
+
+        if state["test_focus"] == "text":
+            if key_code == ord("\t"):
+                state["test_focus"] = "command"
+            elif key_code in (curses.KEY_BACKSPACE, 127, ord("\b")):
+                backspace(state, now_ns)
+            elif isinstance(key_code, str):
+                type_char(state, key_code, now_ns)
+
+        elif state["test_focus"] == "command":
+            if key_code == ord("\t"):
+                next_idx = state["selected_command_idx"] + 1
+                if next_idx >= len(state["command_options"]):
+                    state["test_focus"] = "text"
+                    state["selected_command_idx"] = 0
+                else:
+                    state["selected_command_idx"] = next_idx
+
+            elif key_code == curses.KEY_BTAB:
+                prev_idx = state["selected_command_idx"] - 1
+                if prev_idx < 0:
+                    state["test_focus"] = "text"
+                else:
+                    state["selected_command_idx"] = prev_idx
+
+            elif key_code == 27:
+                state["test_focus"] = "text"
+
+            elif key_code in (curses.KEY_ENTER, 10, 13):
+                command = state["command_options"][state["selected_command_idx"]]
+                if command == "reset":
+                    self.reset()
+                return command
+        return None
+
+    def tick(self):
+        """Updates elapsed time and WPM samples; returns True once the test is over."""
+        state = self.state
+        if not state["started"]:
+            return False
+        current_time = self.now()
+        state["time_elapsed"] = current_time - state["start_time"]
+        if current_time - state["last_wpm_record_time"] >= GRAPH_SAMPLE_RATE:
+            if state["time_elapsed"] > 0:
+                cumulative_wpm = (state["total_typed_chars"] / 5) / (
+                    state["time_elapsed"] / 60
+                )
+                state["wpm_history"].append((state["time_elapsed"], cumulative_wpm))
+                state["net_history"].append(
+                    ((state["total_typed_chars"] - state["errors"]) / 5)
+                    / (state["time_elapsed"] / 60)
+                )
+            state["last_wpm_record_time"] = current_time
+
+        cfg = state["config"]
+        if cfg.get("value") and cfg["mode"] == "time":
+            return state["time_elapsed"] >= cfg["value"]
+        return len(state["typed"]) == len(state["target_text"])
+
+    def results(self, personal_best=None):
+        self.state["personal_best"] = personal_best
+        self.state["results"] = calculate_results(self.state, personal_best)
+        return self.state["results"]
@@ -0,0 +1,82 @@
+BRAILLE_BASE = 0x2800
+# Braille dot bit for each (dot row from the top, dot column) of a 2x4 cell.
+_DOT_BITS = ((0x01, 0x08), (0x02, 0x10), (0x04, 0x20), (0x40, 0x80))
+
+
+class Canvas:
+    """Braille raster of cols x rows terminal cells, i.e. 2 x 4 dots per cell.
+
+    cells holds one packed dot bitmask per cell and owner the series that
+    last drew into it, so overlaid series keep their own color. Dot
+    coordinates have their origin in the bottom-left corner.
+    """
+
+    def __init__(self, cols, rows):
+        self.cols, self.rows = cols, rows
+        self.width, self.height = cols * 2, rows * 4
+        self.cells = bytearray(cols * rows)
+        self.owner = bytearray(cols * rows)
+
+    def set(self, x, y, series=0):
+        if 0 <= x < self.width and 0 <= y < self.height:
+            y = self.height - 1 - y
+            idx = (y >> 2) * self.cols + (x >> 1)
+            self.cells[idx] |= _DOT_BITS[y & 3][x & 1]
+            self.owner[idx] = series
+
+    def line(self, x0, y0, x1, y1, series=0):
+        """Draws a Bresenham line between two dots, both ends included."""
+        dx, dy = abs(x1 - x0), -abs(y1 - y0)
+        sx, sy = (1 if x0 < x1 else -1), (1 if y0 < y1 else -1)
+        err = dx + dy
+        while True:
+            self.set(x0, y0, series)
+            if x0 == x1 and y0 == y1:
+                return
+            e2 = 2 * err
+            if e2 >= dy:
+                err += dy
+                x0 += sx
+            if e2 <= dx:
+                err += dx
+                y0 += sy
+
+    def plot(self, values, y_max, series=0):
+        """Draws values stretched across the full width, scaled to y_max."""
+        n = len(values)
+        if not n or y_max <= 0:
+            return
+        x_scale = (self.width - 1) / (n - 1) if n > 1 else 0
+        y_scale = (self.height - 1) / y_max
+        prev = None
+        for i, value in enumerate(values):
+            point = (round(i * x_scale), round(min(value, y_max) * y_scale))
+            if prev is None:
+                self.set(*point, series)
+            elif point != prev:
+                self.line(*prev, *point, series)
+            prev = point
+
+    def spans(self):
+        """Returns each row, top first, as [(column, text, series)] runs.
+
+        Empty cells are left out so whatever is behind the graph shows
+        through; adjacent cells of the same series are joined into one run.
+        """
+        rows, cells, owner, cols = [], self.cells, self.owner, self.cols
+        for r in range(self.rows):
+            row, run, run_col, run_series = [], [], 0, 0
+            base = r * cols
+            for c in range(cols):
+                bits = cells[base + c]
+                if run and (not bits or owner[base + c] != run_series):
+                    row.append((run_col, "".join(run), run_series))
+                    run = []
+                if bits:
+                    if not run:
+                        run_col, run_series = c, owner[base + c]
+                    run.append(chr(BRAILLE_BASE + bits))
+            if run:
+                row.append((run_col, "".join(run), run_series))
+            rows.append(row)
+        return rows
@@ -0,0 +1,417 @@
+import os
+import sqlite3
+import sys
+import time
+from array import array
+from . import analytics, keylog, storage
+
+HISTORY_FILE = os.path.join(storage.CONFIG_DIR, "history.db")
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS results (
+    id INTEGER PRIMARY KEY,
+    timestamp REAL NOT NULL,
+    mode TEXT NOT NULL,
+    value INTEGER,
+    language TEXT NOT NULL,
+    net_wpm REAL NOT NULL,
+    raw_wpm REAL NOT NULL,
+    acc REAL NOT NULL,
+    consistency REAL NOT NULL,
+    time REAL NOT NULL,
+    char_stats TEXT NOT NULL,
+    wpm_history BLOB NOT NULL,
+    target_text TEXT,
+    keystrokes BLOB,
+    net_history BLOB
+);
+CREATE INDEX IF NOT EXISTS results_by_test
+    ON results (mode, value, language, timestamp);
+CREATE INDEX IF NOT EXISTS results_by_wpm
+    ON results (mode, value, language, net_wpm);
+CREATE TABLE IF NOT EXISTS summaries (
+    test_key TEXT PRIMARY KEY,
+    mode TEXT NOT NULL,
+    value INTEGER,
+    language TEXT NOT NULL,
+    count INTEGER NOT NULL,
+    sum_wpm REAL NOT NULL,
+    sum_acc REAL NOT NULL,
+    best_wpm REAL NOT NULL,
+    best_acc REAL NOT NULL,
+    best_raw_wpm REAL NOT NULL,
+    last_timestamp REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS daily (
+    test_key TEXT NOT NULL,
+    day TEXT NOT NULL,
+    count INTEGER NOT NULL,
+    sum_wpm REAL NOT NULL,
+    sum_acc REAL NOT NULL,
+    best_wpm REAL NOT NULL,
+    PRIMARY KEY (test_key, day)
+);
+CREATE TABLE IF NOT EXISTS key_stats (
+    language TEXT NOT NULL,
+    ngram TEXT NOT NULL,
+    count INTEGER NOT NULL,
+    errors INTEGER NOT NULL,
+    latency REAL NOT NULL,
+    PRIMARY KEY (language, ngram)
+);
+"""
+SCHEMA_VERSION = 5
+# Weak n-grams need this many keystrokes before they are ranked.
+MIN_NGRAM_COUNT = 3
+
+
+def pack_samples(values):
+    """Packs floats as little-endian float64 bytes."""
+    samples = array("d", values)
+    if sys.byteorder == "big":
+        samples.byteswap()
+    return samples.tobytes()
+
+
+def unpack_samples(blob):
+    """Inverse of pack_samples."""
+    samples = array("d", blob)
+    if sys.byteorder == "big":
+        samples.byteswap()
+    return samples
+
+
+class ResultStore:
+    """Append-only log of every completed test, kept in a SQLite database.
+
+    The database runs in WAL mode with synchronous=NORMAL: each test is a
+    single appended row, fsyncs are batched into WAL checkpoints, and a
+    killed process can lose at most the last commits, never corrupt the file.
+    """
+
+    def __init__(self, path=HISTORY_FILE):
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        self.conn = sqlite3.connect(path)
+        self.conn.row_factory = sqlite3.Row
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.executescript(_SCHEMA)
+        self._migrate()
+
+    def _migrate(self):
+        version = self.conn.execute("PRAGMA user_version").fetchone()[0]
+        if version >= SCHEMA_VERSION:
+            return
+        columns = {row[1] for row in self.conn.execute("PRAGMA table_info(results)")}
+        with self.conn:
+            for name, decl in (
+                ("target_text", "TEXT"),
+                ("keystrokes", "BLOB"),
+                ("net_history", "BLOB"),
+            ):
+                if name not in columns:
+                    self.conn.execute(f"ALTER TABLE results ADD COLUMN {name} {decl}")
+        if version < 2:
+            self._rebuild_summaries()
+        if version < 4:
+            self._rebuild_key_stats()
+        self.conn.execute(f"PRAGMA user_version = {SCHEMA_VERSION}")
+
+    def _rebuild_summaries(self):
+        """Recomputes the materialized summaries from the raw results log."""
+        with self.conn:
+            self.conn.execute("DELETE FROM summaries")
+            self.conn.execute("DELETE FROM daily")
+            rows = self.conn.execute(
+                "SELECT timestamp, mode, value, language, net_wpm, raw_wpm, acc"
+                " FROM results ORDER BY id"
+            )
+            for row in rows.fetchall():
+                self._update_summaries(dict(row), row["timestamp"])
+
+    def _rebuild_key_stats(self):
+        """Recomputes the per-character and per-bigram counters from replays."""
+        with self.conn:
+            self.conn.execute("DELETE FROM key_stats")
+            rows = self.conn.execute(
+                "SELECT language, target_text, keystrokes FROM results"
+                " WHERE target_text IS NOT NULL AND keystrokes IS NOT NULL"
+                " ORDER BY id"
+            )
+            for row in rows.fetchall():
+                self._update_key_stats(
+                    row["language"],
+                    row["target_text"],
+                    keylog.KeyLog.from_bytes(row["keystrokes"]),
+                )
+
+    def _update_key_stats(self, language, target_text, log):
+        stats = analytics.ngram_stats(target_text, log.deltas, log.flags)
+        self.conn.executemany(
+            "INSERT INTO key_stats VALUES (?, ?, ?, ?, ?)"
+            " ON CONFLICT (language, ngram) DO UPDATE SET"
+            " count = count + excluded.count,"
+            " errors = errors + excluded.errors,"
+            " latency = latency + excluded.latency",
+            (
+                (language, ngram, count, errors, latency / 1e9)
+                for ngram, (count, errors, latency) in stats.items()
+            ),
+        )
+
+    def _update_summaries(self, row, timestamp):
+        key = test_key(row)
+        self.conn.execute(
+            "INSERT INTO summaries VALUES (?, ?, ?, ?, 1, ?, ?, ?, ?, ?, ?)"
+            " ON CONFLICT (test_key) DO UPDATE SET"
+            " count = count + 1,"
+            " sum_wpm = sum_wpm + excluded.sum_wpm,"
+            " sum_acc = sum_acc + excluded.sum_acc,"
+            " best_acc = CASE WHEN excluded.best_wpm > best_wpm"
+            "   THEN excluded.best_acc ELSE best_acc END,"
+            " best_raw_wpm = CASE WHEN excluded.best_wpm > best_wpm"
+            "   THEN excluded.best_raw_wpm ELSE best_raw_wpm END,"
+            " best_wpm = MAX(best_wpm, excluded.best_wpm),"
+            " last_timestamp = MAX(last_timestamp, excluded.last_timestamp)",
+            (
+                key,
+                row["mode"],
+                row.get("value"),
+                row["language"],
+                row["net_wpm"],
+                row["acc"],
+                row["net_wpm"],
+                row["acc"],
+                row["raw_wpm"],
+                timestamp,
+            ),
+        )
+        self.conn.execute(
+            "INSERT INTO daily VALUES (?, ?, 1, ?, ?, ?)"
+            " ON CONFLICT (test_key, day) DO UPDATE SET"
+            " count = count + 1,"
+            " sum_wpm = sum_wpm + excluded.sum_wpm,"
+            " sum_acc = sum_acc + excluded.sum_acc,"
+            " best_wpm = MAX(best_wpm, excluded.best_wpm)",
+            (
+                key,
+                time.strftime("%Y-%m-%d", time.localtime(timestamp)),
+                row["net_wpm"],
+                row["acc"],
+                row["net_wpm"],
+            ),
+        )
+
+    def close(self):
+        self.conn.close()
+
+    def record(self, cfg, results, timestamp=None, target_text=None, keylog=None):
+        """Appends one finished test, updates the summaries and returns its id.
+
+        The target text and keylog.KeyLog are optional and enable replays.
+        """
+        timestamp = time.time() if timestamp is None else timestamp
+        with self.conn:
+            cursor = self.conn.execute(
+                "INSERT INTO results (timestamp, mode, value, language, net_wpm,"
+                " raw_wpm, acc, consistency, time, char_stats, wpm_history,"
+                " target_text, keystrokes, net_history)"
+                " VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                (
+                    timestamp,
+                    cfg["mode"],
+                    cfg.get("value"),
+                    cfg["language"],
+                    results["net_wpm"],
+                    results["raw_wpm"],
+                    results["acc"],
+                    results["consistency"],
+                    results["time"],
+                    results["char_stats"],
+                    pack_samples(results["wpm_history"]),
+                    target_text,
+                    None if keylog is None else keylog.to_bytes(),
+                    pack_samples(results["net_history"])
+                    if "net_history" in results
+                    else None,
+                ),
+            )
+            self._update_summaries(dict(cfg, **results), timestamp)
+            if target_text is not None and keylog is not None:
+                self._update_key_stats(cfg["language"], target_text, keylog)
+        return cursor.lastrowid
+
+    def get_result(self, result_id=None):
+        """Returns one stored result (the latest if no id is given), or None.
+
+        wpm_history and net_history are unpacked into arrays, keystrokes
+        into a KeyLog.
+        """
+        if result_id is None:
+            row = self.conn.execute(
+                "SELECT * FROM results ORDER BY id DESC LIMIT 1"
+            ).fetchone()
+        else:
+            row = self.conn.execute(
+                "SELECT * FROM results WHERE id = ?", (result_id,)
+            ).fetchone()
+        if row is None:
+            return None
+        result = dict(row)
+        result["wpm_history"] = unpack_samples(row["wpm_history"])
+        if row["net_history"] is not None:
+            result["net_history"] = unpack_samples(row["net_history"])
+        if row["keystrokes"] is not None:
+            result["keystrokes"] = keylog.KeyLog.from_bytes(row["keystrokes"])
+        return result
+
+    def iter_results(self, chunk_size=4096, after_id=0):
+        """Yields the stored results after after_id in id order, in chunks.
+
+        Each chunk is a list of at most chunk_size sqlite3.Row objects with
+        wpm_history still packed, fetched by keyset pagination so memory
+        use doesn't depend on the size of the history. Target texts and
+        keystrokes are left out.
+        """
+        while True:
+            rows = self.conn.execute(
+                "SELECT id, timestamp, mode, value, language, net_wpm, raw_wpm,"
+                " acc, consistency, time, char_stats, wpm_history FROM results"
+                " WHERE id > ? ORDER BY id LIMIT ?",
+                (after_id, chunk_size),
+            ).fetchall()
+            if not rows:
+                return
+            yield rows
+            after_id = rows[-1]["id"]
+
+    def personal_best(self, cfg):
+        """Returns the best stored result for a test configuration, or None."""
+        row = self.conn.execute(
+            "SELECT best_wpm AS net_wpm, best_acc AS acc, best_raw_wpm AS raw_wpm"
+            " FROM summaries WHERE test_key = ?",
+            (test_key(cfg),),
+        ).fetchone()
+        return dict(row) if row else None
+
+    def best_history(self, cfg):
+        """Returns the net WPM samples of the best stored result, or None.
+
+        Results recorded before net samples were stored have none, and
+        their raw samples aren't comparable, so those give None too.
+        """
+        row = self.conn.execute(
+            "SELECT net_history FROM results"
+            " WHERE mode = ? AND value IS ? AND language = ?"
+            " ORDER BY net_wpm DESC LIMIT 1",
+            (cfg["mode"], cfg.get("value"), cfg["language"]),
+        ).fetchone()
+        return unpack_samples(row[0]) if row and row[0] is not None else None
+
+    def weak_ngrams(self, language, size=2, limit=10):
+        """Returns the characters (size 1) or bigrams typed worst, worst first.
+
+        Each entry has count, error_rate, latency (mean seconds) and a score:
+        the error rate, smoothed so rarely typed n-grams don't dominate,
+        times the mean latency.
+        """
+        rows = self.conn.execute(
+            "SELECT ngram, count, errors, latency / count AS latency,"
+            " (errors + 1.0) / (count + 2) * latency / count AS score"
+            " FROM key_stats WHERE language = ? AND length(ngram) = ?"
+            " AND count >= ? ORDER BY score DESC LIMIT ?",
+            (language, size, MIN_NGRAM_COUNT, limit),
+        )
+        return [
+            {
+                "ngram": row["ngram"],
+                "count": row["count"],
+                "error_rate": row["errors"] / row["count"],
+                "latency": row["latency"],
+                "score": row["score"],
+            }
+            for row in rows
+        ]
+
+    def summary(self, cfg):
+        """Returns count, averages, best and last-played time for one test."""
+        row = self.conn.execute(
+            "SELECT * FROM summaries WHERE test_key = ?", (test_key(cfg),)
+        ).fetchone()
+        return _summary_dict(row) if row else None
+
+    def summaries(self, limit=None):
+        """Returns the summaries of every test played, most recent first."""
+        rows = self.conn.execute(
+            "SELECT * FROM summaries ORDER BY last_timestamp DESC LIMIT ?",
+            (-1 if limit is None else limit,),
+        )
+        return [_summary_dict(row) for row in rows]
+
+    def recent_wpm(self, cfg, n):
+        """Returns the net WPM of the last n results, newest first."""
+        rows = self.conn.execute(
+            "SELECT net_wpm FROM results"
+            " WHERE mode = ? AND value IS ? AND language = ?"
+            " ORDER BY timestamp DESC LIMIT ?",
+            (cfg["mode"], cfg.get("value"), cfg["language"], n),
+        )
+        return [row[0] for row in rows]
+
+    def rolling_average(self, cfg, n):
+        """Average net WPM of the last n results, or None without history."""
+        recent = self.recent_wpm(cfg, n)
+        return sum(recent) / len(recent) if recent else None
+
+    def best_of_last(self, cfg, n):
+        """Best net WPM among the last n results, or None without history."""
+        return max(self.recent_wpm(cfg, n), default=None)
+
+    def percentile(self, cfg, pct):
+        """Nearest-rank net WPM percentile (0-100), walked along the WPM index."""
+        summary = self.summary(cfg)
+        if not summary:
+            return None
+        rank = int(round(pct / 100 * (summary["count"] - 1)))
+        row = self.conn.execute(
+            "SELECT net_wpm FROM results"
+            " WHERE mode = ? AND value IS ? AND language = ?"
+            " ORDER BY net_wpm LIMIT 1 OFFSET ?",
+            (cfg["mode"], cfg.get("value"), cfg["language"], rank),
+        ).fetchone()
+        return row[0] if row else None
+
+    def daily(self, cfg, days=None):
+        """Returns per-day count, average and best WPM, most recent day first."""
+        rows = self.conn.execute(
+            "SELECT day, count, sum_wpm / count AS avg_wpm,"
+            " sum_acc / count AS avg_acc, best_wpm"
+            " FROM daily WHERE test_key = ? ORDER BY day DESC LIMIT ?",
+            (test_key(cfg), -1 if days is None else days),
+        )
+        return [dict(row) for row in rows]
+
+
+def test_key(cfg):
+    """The key a test configuration is summarized under, e.g. time_30_english."""
+    return f"{cfg['mode']}_{cfg.get('value') or 'na'}_{cfg['language']}"
+
+
+def _summary_dict(row):
+    return {
+        "test_key": row["test_key"],
+        "mode": row["mode"],
+        "value": row["value"],
+        "language": row["language"],
+        "count": row["count"],
+        "avg_wpm": row["sum_wpm"] / row["count"],
+        "avg_acc": row["sum_acc"] / row["count"],
+        "best_wpm": row["best_wpm"],
+        "last_timestamp": row["last_timestamp"],
+    }
+
+
+def best_of(*pbs):
+    """Returns the entry with the highest net WPM among the non-empty ones."""
+    pbs = [pb for pb in pbs if pb]
+    return max(pbs, key=lambda pb: pb["net_wpm"]) if pbs else None
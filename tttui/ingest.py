@@ -0,0 +1,242 @@
+import hashlib
+import math
+import os
+import re
+import unicodedata
+from array import array
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from . import config, corpus
+
+CHUNK_BYTES = 1 << 20
+# A chunk waiting for a paragraph break is cut anyway at this size.
+MAX_CHUNK_BYTES = 4 * CHUNK_BYTES
+LENGTH_LIMITS = {"words": (1, 20), "quotes": (30, 400)}
+
+_WORD = re.compile(r"\w+(?:['’-]\w+)*")
+_SENTENCE_END = re.compile(r"(?<=[.!?。！？])\s+|(?<=[。！？])")
+
+
+class FingerprintSet:
+    """Set of 64-bit string fingerprints in one open-addressing array.
+
+    About 12 bytes per entry at the maximum load, against well over 100
+    for a set of str, so deduplicating millions of entries stays small.
+    Two different strings sharing a fingerprint (odds ~n²/2⁶⁵) would make
+    the second one count as a duplicate.
+    """
+
+    def __init__(self, capacity=1 << 16):
+        self._slots = array("Q", bytes(8 * capacity))
+        self._mask = capacity - 1
+        self._count = 0
+
+    def __len__(self):
+        return self._count
+
+    @staticmethod
+    def fingerprint(text):
+        digest = hashlib.blake2b(text.encode("utf-8"), digest_size=8).digest()
+        return int.from_bytes(digest, "little") or 1
+
+    def add(self, text):
+        """Adds text; returns False if it was already present."""
+        fp = self.fingerprint(text)
+        slots, mask = self._slots, self._mask
+        i = fp & mask
+        while slots[i]:
+            if slots[i] == fp:
+                return False
+            i = (i + 1) & mask
+        slots[i] = fp
+        self._count += 1
+        if self._count * 10 > len(slots) * 7:
+            self._grow()
+        return True
+
+    def _grow(self):
+        old = self._slots
+        self._slots = array("Q", bytes(16 * len(old)))
+        self._mask = len(self._slots) - 1
+        for fp in old:
+            if fp:
+                i = fp & self._mask
+                while self._slots[i]:
+                    i = (i + 1) & self._mask
+                self._slots[i] = fp
+
+
+def read_chunks(path, encoding="utf-8", chunk_bytes=CHUNK_BYTES):
+    """Yields lists of lines holding about chunk_bytes of text each.
+
+    Chunks end at a blank line where possible, so paragraphs (and the
+    sentences in them) aren't split between two workers.
+    """
+    with open(path, "r", encoding=encoding, errors="replace") as f:
+        chunk, size = [], 0
+        for line in f:
+            chunk.append(line)
+            size += len(line)
+            if size >= chunk_bytes and (not line.strip() or size >= MAX_CHUNK_BYTES):
+                yield chunk
+                chunk, size = [], 0
+        if chunk:
+            yield chunk
+
+
+def _allowed(item, kind, charset):
+    if charset is not None:
+        return charset.fullmatch(item) is not None
+    if kind == "words":
+        return item.replace("'", "").replace("’", "").replace("-", "").isalpha()
+    return item.isprintable() and "�" not in item
+
+
+def normalize_chunk(lines, kind, options):
+    """Splits, normalizes and filters one chunk; runs in a worker process.
+
+    Returns (item, weight) pairs in input order, deduplicated within the
+    chunk. weight is None unless the input is a word-frequency list.
+    """
+    form, lowercase, charset, min_len, max_len, frequency = options
+    charset = re.compile(f"[{charset}]+") if charset else None
+
+    def candidates():
+        if frequency:
+            for line in lines:
+                parts = line.split()
+                if len(parts) >= 2:
+                    try:
+                        weight = float(parts[-1])
+                    except ValueError:
+                        continue
+                    # Anything parse_entries would reject makes the whole
+                    # list unweighted, so such lines are dropped here.
+                    if math.isfinite(weight) and weight >= 0:
+                        yield parts[0], weight
+        elif kind == "words":
+            for line in lines:
+                for match in _WORD.finditer(line):
+                    yield match.group(), None
+        else:
+            for paragraph in re.split(r"\n\s*\n", "".join(lines)):
+                text = " ".join(paragraph.split())
+                for sentence in _SENTENCE_END.split(text):
+                    yield sentence.strip(), None
+
+    seen, out = set(), []
+    for item, weight in candidates():
+        item = unicodedata.normalize(form, item)
+        if lowercase:
+            item = item.lower()
+        if item in seen or not min_len <= len(item) <= max_len:
+            continue
+        if not _allowed(item, kind, charset):
+            continue
+        seen.add(item)
+        out.append((item, weight))
+    return out
+
+
+def _bounded_map(executor, fn, iterable, args, limit):
+    """Like executor.map, but with at most limit tasks queued at a time."""
+    pending = deque()
+    try:
+        for item in iterable:
+            pending.append(executor.submit(fn, item, *args))
+            if len(pending) >= limit:
+                yield pending.popleft().result()
+        while pending:
+            yield pending.popleft().result()
+    finally:
+        for future in pending:
+            future.cancel()
+
+
+def output_path(kind, name):
+    dir_path = config.LANGUAGES_DIR if kind == "words" else config.QUOTES_DIR
+    return os.path.join(dir_path, f"{name}.txt")
+
+
+def import_corpus(
+    kind,
+    name,
+    paths,
+    form="NFC",
+    lowercase=None,
+    charset=None,
+    min_len=None,
+    max_len=None,
+    frequency=False,
+    append=False,
+    encoding="utf-8",
+    jobs=None,
+):
+    """Streams source files into the word or quote list storage.load_items reads.
+
+    Chunks of each file are normalized on a pool of jobs processes (all
+    cores by default, inline for jobs=1) with a bounded number in flight,
+    so memory stays flat however large the input. Entries are written in
+    input order to a temporary file that replaces the list at the end;
+    with append, the existing entries are kept and not imported twice, and
+    a word list must already be weighted exactly when frequency is given
+    (ValueError otherwise), so the file never mixes both line formats.
+    Returns (output path, entries read, entries written).
+    """
+    default_min, default_max = LENGTH_LIMITS[kind]
+    options = (
+        form,
+        kind == "words" if lowercase is None else lowercase,
+        charset,
+        default_min if min_len is None else min_len,
+        default_max if max_len is None else max_len,
+        frequency and kind == "words",
+    )
+    out_path = output_path(kind, name)
+    os.makedirs(os.path.dirname(out_path), exist_ok=True)
+    seen = FingerprintSet()
+    read, written = 0, 0
+    jobs = jobs or os.cpu_count() or 1
+
+    append = append and os.path.exists(out_path)
+    if append and kind == "words":
+        weighted = corpus.is_weighted(corpus.read_lines(out_path))
+        if weighted is not None and weighted != options[-1]:
+            raise ValueError(
+                f"{out_path} is {'a' if weighted else 'not a'} word-frequency"
+                f" list; append with{'' if weighted else 'out'} --frequency"
+            )
+
+    tmp_path = out_path + ".tmp"
+    with open(tmp_path, "w", encoding="utf-8") as out:
+        if append:
+            for line in corpus.read_lines(out_path):
+                out.write(line + "\n")
+                seen.add(line.split()[0] if options[-1] else line)
+                written += 1
+
+        chunks = (chunk for path in paths for chunk in read_chunks(path, encoding))
+        if jobs == 1:
+            results = (normalize_chunk(chunk, kind, options) for chunk in chunks)
+            executor = None
+        else:
+            executor = ProcessPoolExecutor(max_workers=jobs)
+            results = _bounded_map(
+                executor, normalize_chunk, chunks, (kind, options), 2 * jobs
+            )
+        try:
+            for entries in results:
+                read += len(entries)
+                for item, weight in entries:
+                    if seen.add(item):
+                        out.write(item if weight is None else f"{item} {weight:g}")
+                        out.write("\n")
+                        written += 1
+        finally:
+            if executor is not None:
+                results.close()
+                executor.shutdown()
+        out.flush()
+        os.fsync(out.fileno())
+    os.replace(tmp_path, out_path)
+    return out_path, read, written
@@ -0,0 +1,68 @@
+import struct
+import sys
+import time
+from array import array
+
+_COUNT = struct.Struct("<I")
+
+
+class KeyLog:
+    """Per-keystroke event log kept in typed arrays.
+
+    Each event is a perf_counter_ns delta from the previous event (the first
+    one from start()), the typed codepoint and an analytics.KEY_* flag.
+    """
+
+    __slots__ = ("deltas", "chars", "flags", "_last_ns")
+
+    def __init__(self):
+        self.deltas = array("Q")
+        self.chars = array("I")
+        self.flags = bytearray()
+        self._last_ns = None
+
+    def __len__(self):
+        return len(self.flags)
+
+    def start(self, now_ns=None):
+        self._last_ns = time.perf_counter_ns() if now_ns is None else now_ns
+
+    def record(self, char, flag, now_ns=None):
+        now_ns = time.perf_counter_ns() if now_ns is None else now_ns
+        if self._last_ns is None:
+            self._last_ns = now_ns
+        self.deltas.append(now_ns - self._last_ns)
+        self.chars.append(ord(char))
+        self.flags.append(flag)
+        self._last_ns = now_ns
+
+    def times(self):
+        """Returns each event's time in seconds since start() as array('d')."""
+        times, elapsed = array("d"), 0
+        for delta in self.deltas:
+            elapsed += delta
+            times.append(elapsed / 1e9)
+        return times
+
+    def to_bytes(self):
+        deltas, chars = array("Q", self.deltas), array("I", self.chars)
+        if sys.byteorder == "big":
+            deltas.byteswap()
+            chars.byteswap()
+        return b"".join(
+            (_COUNT.pack(len(self)), deltas.tobytes(), chars.tobytes(), self.flags)
+        )
+
+    @classmethod
+    def from_bytes(cls, blob):
+        log = cls()
+        (count,) = _COUNT.unpack_from(blob, 0)
+        deltas_end = _COUNT.size + count * log.deltas.itemsize
+        chars_end = deltas_end + count * log.chars.itemsize
+        log.deltas.frombytes(blob[_COUNT.size : deltas_end])
+        log.chars.frombytes(blob[deltas_end:chars_end])
+        log.flags[:] = blob[chars_end : chars_end + count]
+        if sys.byteorder == "big":
+            log.deltas.byteswap()
+            log.chars.byteswap()
+        return log
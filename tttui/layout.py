@@ -0,0 +1,118 @@
+import bisect
+import itertools
+from array import array
+from .cells import char_width, text_width
+
+MIN_LINE_WIDTH = 20
+LINE_MARGIN = 8
+
+
+def line_width_for(screen_width):
+    """Wrap width that fits a terminal screen_width columns wide."""
+    return max(MIN_LINE_WIDTH, screen_width - 2 * LINE_MARGIN)
+
+
+class Layout:
+    """Word-wraps a stream of words into lines on demand.
+
+    Lines are only produced when asked for, so an endless word stream (time
+    mode) costs nothing up front. Widths are terminal cells, so wide (CJK)
+    characters count double. starts holds each line's offset into text for
+    O(log n) position lookups, widths each line's cell width, and extras
+    the cells taken by extra characters typed over the line's spaces.
+    """
+
+    def __init__(self, words, width):
+        self.width = width
+        self.text = ""
+        self.lines = []
+        self.starts = array("I")
+        self.widths = array("I")
+        self.extras = array("I")
+        self._words = iter(words)
+        self._pending = None
+        self.exhausted = False
+
+    def __len__(self):
+        return len(self.lines)
+
+    def _next_word(self):
+        if self._pending is not None:
+            word, self._pending = self._pending, None
+            return word
+        return next(self._words, None)
+
+    def _next_line(self):
+        """Returns the next line and its width, or (None, 0) at the end."""
+        words, length = [], -1
+        while True:
+            word = self._next_word()
+            if word is None:
+                break
+            word_width = text_width(word)
+            if words and length + 1 + word_width > self.width:
+                self._pending = word
+                break
+            words.append(word)
+            length += 1 + word_width
+        return (" ".join(words), length) if words else (None, 0)
+
+    def extend(self, line_count=None):
+        """Wraps more text until line_count lines exist (all of it if None)."""
+        while line_count is None or len(self.lines) < line_count:
+            line, width = self._next_line()
+            if line is None:
+                self.exhausted = True
+                return
+            if self.lines:
+                self.starts.append(len(self.text) + 1)
+                self.text += " " + line
+            else:
+                self.starts.append(0)
+                self.text = line
+            self.lines.append(line)
+            self.widths.append(width)
+            self.extras.append(0)
+
+    def relayout(self, from_line, width, extra_chars=None):
+        """Re-wraps lines from from_line onward at a new width.
+
+        Earlier lines and the text itself are untouched; only the line breaks
+        after from_line move, and at least as much text is wrapped as before. extra_chars maps text positions to the extra
+        characters typed there, used to recount the re-wrapped lines' extras.
+        """
+        from_line = max(0, min(from_line, len(self.lines) - 1))
+        line_count = None if self.exhausted else len(self.lines)
+        text_length = len(self.text)
+        self.exhausted = False
+        start = self.starts[from_line] if self.lines else 0
+        rest = self.text[start:].split(" ") if self.text else []
+        pending = [self._pending] if self._pending is not None else []
+        self._words = itertools.chain(rest, pending, self._words)
+        self._pending = None
+        self.text = self.text[: max(0, start - 1)]
+        del self.lines[from_line:]
+        del self.starts[from_line:]
+        del self.widths[from_line:]
+        del self.extras[from_line:]
+        self.width = width
+        self.extend(line_count)
+        # Narrower lines hold less text: wrap at least what was there before,
+        # so every typed position still falls inside the text.
+        while not self.exhausted and len(self.text) < text_length:
+            self.extend(len(self.lines) + 1)
+        for pos, char in (extra_chars or {}).items():
+            if pos >= start:
+                self.extras[self.line_index(pos)] += char_width(char)
+
+    def line_index(self, pos):
+        """Returns the index of the line containing text position pos."""
+        return max(0, bisect.bisect_right(self.starts, pos) - 1)
+
+    def line_length(self, line):
+        """On-screen width of a line, including typed extra characters."""
+        return self.widths[line] + self.extras[line]
+
+    def has_separator(self, line):
+        """Whether a space separates this line from a following one."""
+        return line < len(self.lines) - 1 or self._pending is not None
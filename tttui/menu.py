@@ -1,21 +1,59 @@
 import curses
-from . import storage, ui
+import os
+from . import config, sampling, storage, ui
 
 
 class Menu:
-    def __init__(self, stdscr, app_config):
+    def __init__(self, stdscr, app_config, result_store=None):
         self.stdscr = stdscr
         self.app_config = app_config
+        self.result_store = result_store
+        self.stats_options, self.stats_descriptions = [], []
         self.current_menu = "main"
         self.selected_idx = 0
+        self.view = {}
+        self._options_key = None
+        self._options = None
+
+    def invalidate(self):
+        """Forces a full repaint on the next navigate, e.g. after another screen."""
+        self.view = {}
 
     def get_menu_options(self):
-        """Generate menu options, indicating the current selection."""
+        """Return menu options, rebuilding them only when their inputs change."""
+        try:
+            languages_mtime = os.stat(config.LANGUAGES_DIR).st_mtime_ns
+        except FileNotFoundError:
+            languages_mtime = None
+        options_key = (
+            self.app_config["language"],
+            self.app_config["theme"],
+            self.app_config["live_stats"],
+            self.app_config["quote_range"],
+            languages_mtime,
+        )
+        if options_key != self._options_key:
+            self._options = self._build_menu_options()
+            self._options_key = options_key
+        return self._options
+
+    def _build_menu_options(self):
+        """Generate menu options, indicating the current selection.
+
+        The quote menu only offers the length buckets the current
+        language has quotes in.
+        """
         languages = storage.get_available_languages()
         themes = list(self.app_config["themes"].keys())
 
         current_lang = self.app_config["language"]
         current_theme = self.app_config["theme"]
+        quote_lengths = []
+        if storage.has_items("quotes", current_lang):
+            quote_index = storage.load_quote_index(current_lang)
+            quote_lengths = [
+                name for name in sampling.QUOTE_LENGTHS if quote_index.count(name)
+            ]
 
         lang_options = [
             f"{lang} [{'*' if lang == current_lang else ' '}]" for lang in languages
@@ -29,22 +67,81 @@ class Menu:
                 "time",
                 "words",
                 "quote",
+                "adaptive",
                 f"language [{current_lang}]",
                 f"theme [{current_theme}]",
+                f"live stats [{'on' if self.app_config['live_stats'] else 'off'}]",
+                "stats",
             ],
             "time": ["15", "30", "60", "120", "back"],
             "words": ["10", "25", "50", "100", "back"],
+            "quote": [
+                "all",
+                *quote_lengths,
+                f"custom [{self.app_config['quote_range']}]",
+                "back",
+            ],
+            "adaptive": ["25", "50", "100", "back"],
             "language": lang_options + ["back"],
             "theme": theme_options + ["back"],
         }
 
+    def prompt_quote_range(self):
+        """Asks for a custom quote length range; returns it, or None if cancelled."""
+        self.invalidate()
+        quote_index = storage.load_quote_index(self.app_config["language"])
+        text = self.app_config["quote_range"]
+        label = "quote length in characters, as min-max"
+        while True:
+            text = ui.prompt(self.stdscr, "tttui / quote / custom", label, text)
+            if text is None:
+                return None
+            try:
+                bounds = sampling.length_range(text.strip())
+            except ValueError:
+                continue
+            if bounds is None:
+                continue
+            value = "{}-{}".format(*bounds)
+            if not quote_index.count(value):
+                label = f"no quotes are {value} characters long; try another range"
+                continue
+            self.app_config["quote_range"] = value
+            return value
+
+    def load_stats(self, limit=6):
+        """Builds the stats screen from the most recently played tests."""
+        self.stats_options, self.stats_descriptions = [], []
+        if self.result_store is None:
+            return
+        for summary in self.result_store.summaries(limit):
+            test = summary["mode"] + (
+                f" {summary['value']}" if summary["value"] else ""
+            )
+            rolling = self.result_store.rolling_average(summary, 10)
+            best_recent = self.result_store.best_of_last(summary, 10)
+            self.stats_options.append(f"{test} {summary['language']}")
+            self.stats_descriptions.append(
+                f"{summary['count']} tests  best {summary['best_wpm']:.1f}"
+                f"  avg {summary['avg_wpm']:.1f}"
+                f"  last 10 {rolling:.1f} (best {best_recent:.1f})"
+            )
+
     def navigate(self):
-        menu_options = self.get_menu_options()
+        menu_options = dict(
+            self.get_menu_options(), stats=self.stats_options + ["back"]
+        )
         title = (
             "tttui" if self.current_menu == "main" else f"tttui / {self.current_menu}"
         )
+        descriptions = self.stats_descriptions if self.current_menu == "stats" else None
         ui.display_menu(
-            self.stdscr, title, menu_options[self.current_menu], self.selected_idx
+            self.stdscr,
+            title,
+            menu_options[self.current_menu],
+            self.selected_idx,
+            descriptions=descriptions,
+            view=self.view,
         )
 
         key = self.stdscr.getch()
@@ -73,19 +170,39 @@ class Menu:
             return {"action": "navigate"}
 
         if self.current_menu == "main":
-            if selection in ["time", "words", "language", "theme"]:
+            if selection in [
+                "time",
+                "words",
+                "quote",
+                "adaptive",
+                "language",
+                "theme",
+                "stats",
+            ]:
                 self.current_menu = selection
                 self.selected_idx = 0
-            elif selection == "quote":
-                return {"action": "start_test", "mode": "quote"}
+                if selection == "stats":
+                    self.load_stats()
+            elif selection == "live":
+                self.app_config["live_stats"] = not self.app_config["live_stats"]
+                return {"action": "setting_changed"}
 
-        elif self.current_menu in ["time", "words"]:
+        elif self.current_menu in ["time", "words", "adaptive"]:
             return {
                 "action": "start_test",
                 "mode": self.current_menu,
                 "value": int(selection),
             }
 
+        elif self.current_menu == "quote":
+            if selection == "custom":
+                value = self.prompt_quote_range()
+                if value is None:
+                    return {"action": "navigate"}
+            else:
+                value = None if selection == "all" else selection
+            return {"action": "start_test", "mode": "quote", "value": value}
+
         elif self.current_menu == "language":
             self.app_config["language"] = selection
             return {"action": "setting_changed"}
@@ -0,0 +1,179 @@
+import contextlib
+import cProfile
+import json
+import os
+import time
+import tracemalloc
+from array import array
+from . import storage
+
+PROFILE_DIR = os.path.join(storage.CONFIG_DIR, "profiles")
+PROFILE_ENV = "TTTUI_PROFILE"
+SUB_BUCKET_BITS = 5
+
+
+class Histogram:
+    """Log-linear (HDR-style) histogram of nanosecond durations.
+
+    Values below 2**SUB_BUCKET_BITS are exact; above that every power of two
+    is split into 2**(SUB_BUCKET_BITS - 1) buckets, i.e. ~3% precision at any
+    magnitude with a few hundred counters.
+    """
+
+    def __init__(self):
+        self.counts = array("Q")
+        self.count = 0
+        self.total = 0
+        self.max = 0
+
+    @staticmethod
+    def _index(value):
+        shift = max(0, value.bit_length() - SUB_BUCKET_BITS)
+        return (shift << (SUB_BUCKET_BITS - 1)) + (value >> shift)
+
+    @staticmethod
+    def _value(index):
+        half = 1 << (SUB_BUCKET_BITS - 1)
+        if index < 2 * half:
+            return index
+        shift = index // half - 1
+        sub = index - shift * half
+        return (sub << shift) + ((1 << shift) >> 1)
+
+    def record(self, value):
+        idx = self._index(value)
+        if idx >= len(self.counts):
+            self.counts.extend([0] * (idx + 1 - len(self.counts)))
+        self.counts[idx] += 1
+        self.count += 1
+        self.total += value
+        if value > self.max:
+            self.max = value
+
+    def percentile(self, pct):
+        if not self.count:
+            return 0
+        threshold, seen = max(1, pct / 100 * self.count), 0
+        for idx, n in enumerate(self.counts):
+            seen += n
+            if seen >= threshold:
+                return min(self._value(idx), self.max)
+        return self.max
+
+    def summary(self):
+        return {
+            "count": self.count,
+            "mean_us": self.total / self.count / 1e3 if self.count else 0,
+            "p50_us": self.percentile(50) / 1e3,
+            "p90_us": self.percentile(90) / 1e3,
+            "p99_us": self.percentile(99) / 1e3,
+            "max_us": self.max / 1e3,
+        }
+
+
+class Profiler:
+    """Opt-in timing of the test loop's render and input phases.
+
+    Optional cProfile and tracemalloc captures cover one test each and are
+    written next to the summary file.
+    """
+
+    enabled = True
+
+    def __init__(self, out_dir=PROFILE_DIR, use_cprofile=False, use_tracemalloc=False):
+        self.out_dir = out_dir
+        self.phases = {}
+        self.use_cprofile = use_cprofile
+        self.use_tracemalloc = use_tracemalloc
+        self._cprofile = None
+        self._tests = 0
+        self._stamp = time.strftime("%Y%m%d-%H%M%S")
+
+    @contextlib.contextmanager
+    def phase(self, name):
+        start = time.perf_counter_ns()
+        try:
+            yield
+        finally:
+            self.record(name, time.perf_counter_ns() - start)
+
+    def record(self, name, duration_ns):
+        histogram = self.phases.get(name)
+        if histogram is None:
+            histogram = self.phases[name] = Histogram()
+        histogram.record(duration_ns)
+
+    def overlay(self):
+        """Short status lines for the corner of the typing view."""
+        lines = []
+        for name in ("render", "latency"):
+            histogram = self.phases.get(name)
+            if histogram and histogram.count:
+                lines.append(
+                    f"{name} p50 {histogram.percentile(50) / 1e6:.2f}ms"
+                    f" p99 {histogram.percentile(99) / 1e6:.2f}ms"
+                )
+        return lines
+
+    def _path(self, suffix):
+        os.makedirs(self.out_dir, exist_ok=True)
+        return os.path.join(self.out_dir, f"profile-{self._stamp}{suffix}")
+
+    def test_started(self):
+        if self.use_tracemalloc and not tracemalloc.is_tracing():
+            tracemalloc.start()
+        if self.use_cprofile and self._cprofile is None:
+            self._cprofile = cProfile.Profile()
+            self._cprofile.enable()
+
+    def test_finished(self):
+        self._tests += 1
+        if self._cprofile is not None:
+            self._cprofile.disable()
+            self._cprofile.dump_stats(self._path(f"-test{self._tests}.pstats"))
+            self._cprofile = None
+        if self.use_tracemalloc and tracemalloc.is_tracing():
+            snapshot = tracemalloc.take_snapshot()
+            tracemalloc.stop()
+            with open(self._path(f"-test{self._tests}.tracemalloc.txt"), "w") as f:
+                for stat in snapshot.statistics("lineno")[:50]:
+                    f.write(f"{stat}\n")
+
+    def dump(self):
+        """Writes the phase summaries as JSON and returns the file path."""
+        if self._cprofile is not None:
+            self._cprofile.disable()
+            self._cprofile = None
+        path = self._path(".json")
+        with open(path, "w") as f:
+            json.dump(
+                {name: h.summary() for name, h in sorted(self.phases.items())},
+                f,
+                indent=2,
+            )
+        return path
+
+
+class NullProfiler:
+    """Stand-in used when profiling is off; every hook is a no-op."""
+
+    enabled = False
+    _null_phase = contextlib.nullcontext()
+
+    def phase(self, name):
+        return self._null_phase
+
+    def record(self, name, duration_ns):
+        pass
+
+    def overlay(self):
+        return []
+
+    def test_started(self):
+        pass
+
+    def test_finished(self):
+        pass
+
+    def dump(self):
+        return None
@@ -0,0 +1,446 @@
+import asyncio
+import curses
+import getpass
+import json
+import math
+import struct
+import sys
+import time
+from . import config, game, storage, ui
+
+DEFAULT_PORT = 7878
+TICK_RATE = 10
+COUNTDOWN = 3.0
+INTERMISSION = 5.0
+RACE_TIMEOUT = 300.0
+TIME_MODE_GRACE = 2.0
+HELLO_TIMEOUT = 5.0
+NAME_LENGTH = 16
+# Per-client write buffer sizes: above HIGH_WATER a client is skipped for a
+# tick and gets a full snapshot once it drains; above MAX_BUFFER it is dropped.
+HIGH_WATER = 64 * 1024
+MAX_BUFFER = 1024 * 1024
+# Characters of text generated per second of a time-mode race (~360 WPM).
+TIME_MODE_CHARS_PER_SECOND = 30
+
+# Client -> server frames.
+HELLO, PROGRESS, FINISH = 1, 2, 3
+# Server -> client frames.
+WELCOME, ROSTER, RACE, START, STATE, RESULTS = 16, 17, 18, 19, 20, 21
+
+_HEADER = struct.Struct("<BI")  # frame type, payload length
+_ID = struct.Struct("<H")
+_POSITION = struct.Struct("<I")
+_FINISH = struct.Struct("<ff")  # net WPM, accuracy
+_ENTRY = struct.Struct("<HI")  # player id, caret position
+
+
+def encode(kind, payload=b""):
+    return _HEADER.pack(kind, len(payload)) + payload
+
+
+async def read_frame(reader):
+    kind, length = _HEADER.unpack(await reader.readexactly(_HEADER.size))
+    return kind, (await reader.readexactly(length) if length else b"")
+
+
+def encode_state(entries):
+    """Packs (player id, caret position) pairs into one STATE frame."""
+    payload = bytearray(_ID.pack(len(entries)))
+    for entry in entries:
+        payload += _ENTRY.pack(*entry)
+    return encode(STATE, bytes(payload))
+
+
+def decode_state(payload):
+    (count,) = _ID.unpack_from(payload)
+    return [
+        _ENTRY.unpack_from(payload, _ID.size + i * _ENTRY.size) for i in range(count)
+    ]
+
+
+def race_text(cfg):
+    """Draws one target text for every racer; time mode gets a fixed length."""
+    state = game.reset_game(cfg)
+    if cfg["mode"] == "time":
+        layout = state["layout"]
+        needed = cfg.get("value", 60) * TIME_MODE_CHARS_PER_SECOND
+        while len(state["target_text"]) < needed and not layout.exhausted:
+            game.extend_lines(state, len(layout) + 8)
+    return state["target_text"]
+
+
+class Player:
+    __slots__ = ("id", "name", "writer", "pos", "result", "racing", "stale")
+
+    def __init__(self, player_id, name, writer):
+        self.id = player_id
+        self.name = name
+        self.writer = writer
+        self.pos = 0
+        self.result = None
+        self.racing = False
+        self.stale = True
+
+
+class RaceServer:
+    """Runs back-to-back races for every connected client.
+
+    A race starts once min_players clients are connected; clients joining
+    mid-race wait for the next one. Progress frames only update in-memory
+    positions; a single broadcaster sends the positions that changed since
+    the last tick to every racer, encoded once per tick.
+    """
+
+    def __init__(self, cfg, min_players=2, tick_rate=TICK_RATE, countdown=COUNTDOWN):
+        self.cfg = cfg
+        self.min_players = min_players
+        self.tick = 1 / tick_rate
+        self.countdown = countdown
+        self.players = {}
+        self.racers = []
+        self.changed = set()
+        self.roster_dirty = False
+        self.started_at = 0.0
+        self._next_id = 1
+        # Created by serve_forever: before 3.10 an Event binds to the loop
+        # current at construction, which isn't the one asyncio.run starts.
+        self._joined = None
+
+    async def handle(self, reader, writer):
+        try:
+            kind, payload = await asyncio.wait_for(read_frame(reader), HELLO_TIMEOUT)
+        except (asyncio.IncompleteReadError, asyncio.TimeoutError, ConnectionError):
+            writer.close()
+            return
+        if kind != HELLO:
+            writer.close()
+            return
+        player_id, self._next_id = self._next_id, self._next_id % 0xFFFF + 1
+        name = payload.decode("utf-8", "replace").strip()[:NAME_LENGTH]
+        player = Player(player_id, name or f"player{player_id}", writer)
+        self.players[player_id] = player
+        self.roster_dirty = True
+        writer.write(encode(WELCOME, _ID.pack(player_id)))
+        self._joined.set()
+        try:
+            while True:
+                kind, payload = await read_frame(reader)
+                if not player.racing:
+                    continue
+                if kind == PROGRESS:
+                    (player.pos,) = _POSITION.unpack(payload)
+                    self.changed.add(player_id)
+                elif kind == FINISH and player.result is None:
+                    wpm, acc = _FINISH.unpack(payload)
+                    player.result = (wpm, acc, time.monotonic() - self.started_at)
+                    self.changed.add(player_id)
+        except (asyncio.IncompleteReadError, ConnectionError, struct.error):
+            pass
+        finally:
+            player.racing = False
+            del self.players[player_id]
+            self.roster_dirty = True
+            writer.close()
+
+    def _send(self, player, data):
+        """Queues a frame without waiting; drops clients that stopped reading."""
+        if player.writer.is_closing():
+            return False
+        if player.writer.transport.get_write_buffer_size() > MAX_BUFFER:
+            player.writer.close()
+            return False
+        player.writer.write(data)
+        return True
+
+    def broadcast(self):
+        """Sends one tick's roster and position updates."""
+        if self.roster_dirty:
+            self.roster_dirty = False
+            roster = json.dumps(
+                {player.id: player.name for player in self.players.values()}
+            ).encode()
+            for player in list(self.players.values()):
+                self._send(player, encode(ROSTER, roster))
+
+        racers = [player for player in self.racers if player.racing]
+        if not racers:
+            return
+        changed, self.changed = self.changed, set()
+        delta = full = None
+        for player in racers:
+            if player.writer.transport.get_write_buffer_size() > HIGH_WATER:
+                player.stale = True
+                continue
+            if player.stale:
+                if full is None:
+                    full = encode_state([(p.id, p.pos) for p in racers])
+                self._send(player, full)
+                player.stale = False
+            elif changed:
+                if delta is None:
+                    delta = encode_state(
+                        [(p.id, p.pos) for p in racers if p.id in changed]
+                    )
+                self._send(player, delta)
+
+    async def _broadcaster(self):
+        while True:
+            self.broadcast()
+            await asyncio.sleep(self.tick)
+
+    def standings(self):
+        """Finished racers by time (by WPM in time mode), then the rest by progress."""
+        finished = [p for p in self.racers if p.result is not None]
+        if self.cfg["mode"] == "time":
+            finished.sort(key=lambda p: -p.result[0])
+        else:
+            finished.sort(key=lambda p: p.result[2])
+        rest = sorted(
+            (p for p in self.racers if p.result is None), key=lambda p: -p.pos
+        )
+        return [
+            {
+                "id": p.id,
+                "name": p.name,
+                "wpm": p.result[0] if p.result else None,
+                "acc": p.result[1] if p.result else None,
+                "pos": p.pos,
+            }
+            for p in finished + rest
+        ]
+
+    async def race(self):
+        racers = list(self.players.values())
+        for player in racers:
+            player.pos, player.result, player.racing = 0, None, True
+            player.stale = True
+        self.racers = racers
+        race = {
+            "config": self.cfg,
+            "text": race_text(self.cfg),
+            "countdown": self.countdown,
+        }
+        race_frame = encode(RACE, json.dumps(race).encode())
+        for player in racers:
+            self._send(player, race_frame)
+        await asyncio.sleep(self.countdown)
+
+        self.started_at = time.monotonic()
+        for player in racers:
+            self._send(player, encode(START))
+        limit = RACE_TIMEOUT
+        if self.cfg["mode"] == "time":
+            limit = self.cfg.get("value", 60) + TIME_MODE_GRACE
+        while time.monotonic() - self.started_at < limit and any(
+            player.racing and player.result is None for player in racers
+        ):
+            await asyncio.sleep(self.tick)
+
+        self.broadcast()
+        results = encode(RESULTS, json.dumps(self.standings()).encode())
+        for player in racers:
+            if player.racing:
+                self._send(player, results)
+                player.racing = False
+        self.racers = []
+
+    async def serve_forever(self, host=None, port=DEFAULT_PORT, unix_path=None):
+        self._joined = asyncio.Event()
+        if unix_path:
+            server = await asyncio.start_unix_server(self.handle, unix_path)
+        else:
+            server = await asyncio.start_server(self.handle, host, port)
+        broadcaster = asyncio.ensure_future(self._broadcaster())
+        try:
+            async with server:
+                while True:
+                    while len(self.players) < self.min_players:
+                        self._joined.clear()
+                        await self._joined.wait()
+                    await self.race()
+                    await asyncio.sleep(INTERMISSION)
+        finally:
+            broadcaster.cancel()
+
+
+def serve(cfg, host=None, port=DEFAULT_PORT, unix_path=None, **options):
+    try:
+        asyncio.run(RaceServer(cfg, **options).serve_forever(host, port, unix_path))
+    except KeyboardInterrupt:
+        pass
+
+
+class RaceClient:
+    """State of one client connection, fed by frames from the server."""
+
+    def __init__(self, stdscr, writer, name):
+        self.stdscr = stdscr
+        self.writer = writer
+        self.name = name
+        self.id = None
+        self.roster = {}
+        self.positions = {}
+        self.engine = None
+        self.phase = "lobby"
+        self.countdown_until = 0
+        self.standings = []
+        self.sent_pos = 0
+        self.last_send = 0
+        self.wake = asyncio.Event()
+
+    def handle_frame(self, kind, payload):
+        if kind == WELCOME:
+            (self.id,) = _ID.unpack(payload)
+        elif kind == ROSTER:
+            self.roster = {int(k): v for k, v in json.loads(payload).items()}
+        elif kind == RACE:
+            race = json.loads(payload)
+            self.engine = game.Engine(
+                race["config"],
+                target_text=race["text"],
+                screen_width=self.stdscr.getmaxyx()[1],
+            )
+            self.engine.state["command_options"] = ["leave"]
+            self.positions = {}
+            self.sent_pos = 0
+            self.phase = "countdown"
+            self.countdown_until = time.monotonic() + race["countdown"]
+        elif kind == START and self.engine is not None:
+            self.engine.start()
+            self.phase = "racing"
+        elif kind == STATE:
+            self.positions.update(decode_state(payload))
+        elif kind == RESULTS:
+            self.standings = json.loads(payload)
+            self.phase = "results"
+        self.wake.set()
+
+    def send_progress(self, force=False):
+        pos = len(self.engine.state["typed"])
+        now = time.monotonic()
+        if pos != self.sent_pos and (force or now - self.last_send >= 1 / TICK_RATE):
+            self.writer.write(encode(PROGRESS, _POSITION.pack(pos)))
+            self.sent_pos, self.last_send = pos, now
+
+    def opponents(self):
+        """(name, progress, is_self) bars, sorted by progress."""
+        positions = dict(self.positions)
+        positions[self.id] = len(self.engine.state["typed"])
+        scale = len(self.engine.state["target_text"])
+        if self.engine.state["config"]["mode"] == "time":
+            scale = max(positions.values())
+        return sorted(
+            (
+                (
+                    self.roster.get(pid, f"player{pid}"),
+                    pos / max(1, scale),
+                    pid == self.id,
+                )
+                for pid, pos in positions.items()
+            ),
+            key=lambda bar: -bar[1],
+        )
+
+    def handle_key(self, key):
+        """Applies one key; returns False once the user leaves."""
+        if key == curses.KEY_RESIZE:
+            if self.engine is not None:
+                self.engine.resize(self.stdscr.getmaxyx()[1])
+            return True
+        if self.phase != "racing":
+            return key != "q"
+        return self.engine.feed_key(key) != "leave"
+
+    def update(self):
+        if self.phase != "racing":
+            return
+        self.send_progress()
+        if self.engine.tick():
+            results = self.engine.results()
+            self.send_progress(force=True)
+            self.writer.write(
+                encode(FINISH, _FINISH.pack(results["net_wpm"], results["acc"]))
+            )
+            self.phase = "finished"
+
+    def render(self):
+        if self.phase in ("racing", "finished"):
+            ui.display_test_ui(
+                self.stdscr, self.engine.state, opponents=self.opponents()
+            )
+        elif self.phase == "countdown":
+            remaining = max(0.0, self.countdown_until - time.monotonic())
+            ui.display_race_screen(
+                self.stdscr,
+                f"Race starts in {math.ceil(remaining)}...",
+                [name for _, name in sorted(self.roster.items())],
+            )
+        elif self.phase == "results":
+            ui.display_race_screen(
+                self.stdscr,
+                "Race results",
+                [
+                    f"{rank}. {entry['name']}"
+                    + (f"  {entry['wpm']:.1f} WPM" if entry["wpm"] is not None else "")
+                    + ("  <" if entry["id"] == self.id else "")
+                    for rank, entry in enumerate(self.standings, 1)
+                ],
+                "Next race starts soon. Press 'q' to leave.",
+            )
+        else:
+            ui.display_race_screen(
+                self.stdscr,
+                f"Waiting for players ({len(self.roster)} connected)",
+                [name for _, name in sorted(self.roster.items())],
+                "Press 'q' to leave.",
+            )
+
+
+async def _client(stdscr, host, port, unix_path, name):
+    if unix_path:
+        reader, writer = await asyncio.open_unix_connection(unix_path)
+    else:
+        reader, writer = await asyncio.open_connection(host, port)
+    client = RaceClient(stdscr, writer, name)
+    writer.write(encode(HELLO, name.encode()[:NAME_LENGTH]))
+
+    async def receive():
+        try:
+            while True:
+                client.handle_frame(*await read_frame(reader))
+        except (asyncio.IncompleteReadError, ConnectionError):
+            client.phase = "disconnected"
+            client.wake.set()
+
+    receiver = asyncio.ensure_future(receive())
+    loop = asyncio.get_running_loop()
+    loop.add_reader(sys.stdin.fileno(), client.wake.set)
+    stdscr.nodelay(True)
+    try:
+        while client.phase != "disconnected":
+            while True:
+                key = game.read_key(stdscr)
+                if key == -1:
+                    break
+                if not client.handle_key(key):
+                    return
+            client.update()
+            client.render()
+            client.wake.clear()
+            try:
+                await asyncio.wait_for(client.wake.wait(), 1 / TICK_RATE)
+            except asyncio.TimeoutError:
+                pass
+    finally:
+        loop.remove_reader(sys.stdin.fileno())
+        receiver.cancel()
+        writer.close()
+
+
+def join(stdscr, host, port=DEFAULT_PORT, unix_path=None, name=None):
+    """Joins a race server and plays its races until the user leaves."""
+    curses.curs_set(0)
+    prefs = storage.load_config()["user_preferences"]
+    ui.init_colors(config.THEMES.get(prefs.get("theme"), config.THEMES["default"]))
+    asyncio.run(_client(stdscr, host, port, unix_path, name or getpass.getuser()))
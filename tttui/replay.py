@@ -0,0 +1,55 @@
+import curses
+import time
+from . import analytics, config, game, storage, ui
+
+FRAME_INTERVAL = 0.1
+
+
+def _wait_until(stdscr, state, clock_start, target, speed):
+    """Renders the replay until the replay clock reaches target seconds.
+
+    Returns False if the user pressed q to stop the replay.
+    """
+    while True:
+        elapsed = (time.perf_counter() - clock_start) * speed
+        state["time_elapsed"] = min(elapsed, target)
+        ui.display_test_ui(stdscr, state)
+        remaining = (target - elapsed) / speed
+        if remaining <= 0:
+            return True
+        stdscr.timeout(max(1, int(min(remaining, FRAME_INTERVAL) * 1000)))
+        if stdscr.getch() == ord("q"):
+            return False
+
+
+def replay(stdscr, result, speed=1.0):
+    """Plays a stored result back in the typing view at the given speed."""
+    curses.curs_set(0)
+    prefs = storage.load_config()["user_preferences"]
+    ui.init_colors(config.THEMES.get(prefs.get("theme"), config.THEMES["default"]))
+
+    cfg = {"mode": result["mode"], "language": result["language"]}
+    if result["value"] is not None:
+        cfg["value"] = result["value"]
+    state = game.reset_game(
+        cfg, target_text=result["target_text"], screen_width=stdscr.getmaxyx()[1]
+    )
+    state["started"] = True
+
+    log = result["keystrokes"]
+    clock_start = time.perf_counter()
+    for t, code, flag in zip(log.times(), log.chars, log.flags):
+        if not _wait_until(stdscr, state, clock_start, t, speed):
+            return
+        if flag == analytics.KEY_BACKSPACE:
+            game.backspace(state)
+        else:
+            game.type_char(state, chr(code))
+
+    if not _wait_until(stdscr, state, clock_start, result["time"], speed):
+        return
+    h, w = stdscr.getmaxyx()
+    msg = "Replay finished. Press any key to exit."
+    stdscr.addstr(h - 2, (w - len(msg)) // 2, msg, curses.A_DIM)
+    stdscr.timeout(-1)
+    stdscr.getch()
@@ -0,0 +1,113 @@
+import random
+import sys
+from array import array
+from bisect import bisect_left, bisect_right
+
+# Quote length buckets in characters, inclusive.
+QUOTE_LENGTHS = {"short": (1, 100), "medium": (101, 300), "long": (301, sys.maxsize)}
+
+
+class Sampler:
+    """Draws words from a corpus in time proportional to the draw count.
+
+    Unweighted corpora pick indices uniformly. Weighted corpora use Vose's
+    alias tables, built once in O(n), so every later draw is O(1).
+    """
+
+    def __init__(self, items, weights=None):
+        self.items = items
+        self.prob, self.alias = None, None
+        if weights is not None and len(weights) == len(items) and sum(weights) > 0:
+            self._build_alias(weights)
+
+    def _build_alias(self, weights):
+        n = len(weights)
+        total = sum(weights)
+        scaled = array("d", (w * n / total for w in weights))
+        self.prob, self.alias = array("d", bytes(8 * n)), array("I", bytes(4 * n))
+        small = [i for i, p in enumerate(scaled) if p < 1.0]
+        large = [i for i, p in enumerate(scaled) if p >= 1.0]
+        while small and large:
+            s, l = small.pop(), large.pop()
+            self.prob[s], self.alias[s] = scaled[s], l
+            scaled[l] -= 1.0 - scaled[s]
+            (small if scaled[l] < 1.0 else large).append(l)
+        for i in small + large:
+            self.prob[i] = 1.0
+
+    def index(self):
+        """Draws one corpus index."""
+        i = random.randrange(len(self.items))
+        if self.prob is not None and random.random() >= self.prob[i]:
+            return self.alias[i]
+        return i
+
+    def sample(self, k):
+        """Returns k words. Unweighted draws are distinct while the corpus allows."""
+        if self.prob is None:
+            k = min(k, len(self.items))
+            return [self.items[i] for i in random.sample(range(len(self.items)), k)]
+        return [self.items[self.index()] for _ in range(k)]
+
+    def stream(self):
+        """Yields words forever, e.g. for time mode."""
+        while True:
+            yield self.items[self.index()]
+
+
+def length_range(value):
+    """Parses a quote length: a QUOTE_LENGTHS name or "min-max" characters.
+
+    Returns None (any length) for None or "all"; raises ValueError otherwise.
+    """
+    if value in (None, "all"):
+        return None
+    if value in QUOTE_LENGTHS:
+        return QUOTE_LENGTHS[value]
+    low, sep, high = str(value).partition("-")
+    low, high = int(low), int(high) if sep else int(low)
+    if low < 0 or high < low:
+        raise ValueError(f"bad quote length range {value!r}")
+    return low, high
+
+
+class LengthIndex:
+    """Item ids sorted by length, for random picks within a length range.
+
+    lengths[i] is the length of items[ids[i]], so the items in a range
+    are one contiguous slice found by bisection; the QUOTE_LENGTHS
+    buckets' slices are computed up front. Each pick is O(log n).
+    """
+
+    def __init__(self, items):
+        self.items = items
+        order = sorted(range(len(items)), key=lambda i: len(items[i]))
+        self.ids = array("I", order)
+        self.lengths = array("I", (len(items[i]) for i in order))
+        self.buckets = {
+            name: self._slice(low, high) for name, (low, high) in QUOTE_LENGTHS.items()
+        }
+
+    def __len__(self):
+        return len(self.ids)
+
+    def _slice(self, low, high):
+        return bisect_left(self.lengths, low), bisect_right(self.lengths, high)
+
+    def span(self, value):
+        """Returns the (start, end) slice of ids matching a length_range value."""
+        if value in self.buckets:
+            return self.buckets[value]
+        bounds = length_range(value)
+        return (0, len(self.ids)) if bounds is None else self._slice(*bounds)
+
+    def count(self, value):
+        start, end = self.span(value)
+        return end - start
+
+    def choice(self, value=None):
+        """Returns a random item whose length matches value, or None if none does."""
+        start, end = self.span(value)
+        if start >= end:
+            return None
+        return self.items[self.ids[random.randrange(start, end)]]
@@ -1,6 +1,7 @@
 import os
 import json
-from . import config
+from collections import OrderedDict
+from . import adaptive, config, corpus, sampling
 
 CONFIG_DIR = os.path.expanduser("~/.config/tttui")
 CONFIG_FILE = os.path.join(CONFIG_DIR, "config.json")
@@ -8,9 +9,15 @@ DEFAULT_CONFIG = {
     "user_preferences": {
         "language": "english",
         "theme": "default",
+        "live_stats": False,
+        "quote_range": "50-150",
     },
     "personal_bests": {},
 }
+INDEX_DIR = os.path.join(CONFIG_DIR, "index")
+CORPUS_CACHE_SIZE = 8
+
+_corpus_cache = OrderedDict()
 
 
 def _ensure_config_file():
@@ -35,14 +42,22 @@ def load_config():
 
 
 def save_config(config_data):
-    """Save the user's configuration to the JSON file."""
+    """Save the user's configuration to the JSON file.
+
+    The file is written to a temporary sibling and renamed into place, so an
+    interrupted save never leaves a truncated config behind.
+    """
     _ensure_config_file()
-    with open(CONFIG_FILE, "w") as f:
+    tmp_file = CONFIG_FILE + ".tmp"
+    with open(tmp_file, "w") as f:
         json.dump(config_data, f, indent=2)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_file, CONFIG_FILE)
 
 
 def get_pb(all_pbs, test_key):
-    """Get the personal best for a specific test key."""
+    """Get the personal best for a test key from the legacy config.json PBs."""
     return all_pbs.get(test_key)
 
 
@@ -56,20 +71,134 @@ def get_available_languages():
     """Dynamically find available language files."""
     if not os.path.exists(config.LANGUAGES_DIR):
         return ["english"]
-    return [
-        f.replace(".txt", "")
-        for f in os.listdir(config.LANGUAGES_DIR)
-        if f.endswith(".txt")
-    ] or ["english"]
+    languages = []
+    for f in os.listdir(config.LANGUAGES_DIR):
+        name, ext = os.path.splitext(f)
+        if ext in (".txt", corpus.COMPILED_EXT) and name not in languages:
+            languages.append(name)
+    return languages or ["english"]
 
 
-def load_items(item_type, language):
-    """Generic function to load words or quotes from a file."""
+def _corpus_source(file_path):
+    """Pick the compiled corpus if it is at least as new as the .txt file."""
+    compiled = corpus.compiled_path(file_path)
+    try:
+        compiled_mtime = os.stat(compiled).st_mtime_ns
+    except FileNotFoundError:
+        return file_path, os.stat(file_path).st_mtime_ns
+    try:
+        if os.stat(file_path).st_mtime_ns > compiled_mtime:
+            return file_path, os.stat(file_path).st_mtime_ns
+    except FileNotFoundError:
+        pass
+    return compiled, compiled_mtime
+
+
+def _placeholder(message):
+    """Corpus entry for a missing or empty file: one item saying so."""
+    return {"items": (message,), "weights": None, "placeholder": True}
+
+
+def _load_corpus(item_type, language):
+    """Returns the cached corpus entry for a word or quote file, loading it if stale."""
     dir_path = config.LANGUAGES_DIR if item_type == "words" else config.QUOTES_DIR
     file_path = os.path.join(dir_path, f"{language}.txt")
+    cache_key = (item_type, language)
     try:
-        with open(file_path, "r", encoding="utf-8") as f:
-            items = [line.strip() for line in f if line.strip()]
-        return items if items else [f"No {item_type} found for {language}"]
+        source, mtime = _corpus_source(file_path)
     except FileNotFoundError:
-        return [f"No {item_type} file for {language}"]
+        _corpus_cache.pop(cache_key, None)
+        return _placeholder(f"No {item_type} file for {language}")
+
+    stamp = (source, mtime)
+    cached = _corpus_cache.get(cache_key)
+    if cached and cached["stamp"] == stamp:
+        _corpus_cache.move_to_end(cache_key)
+        return cached
+
+    items, weights = None, None
+    if source != file_path:
+        try:
+            items = corpus.CompiledCorpus(source)
+            weights = items.weights
+        except ValueError:
+            pass
+    if items is None:
+        try:
+            lines = corpus.read_lines(file_path)
+            if item_type == "words":
+                items, weights = corpus.parse_entries(lines)
+            else:
+                items = tuple(lines)
+        except FileNotFoundError:
+            return _placeholder(f"No {item_type} file for {language}")
+    if not items:
+        entry = _placeholder(f"No {item_type} found for {language}")
+    else:
+        entry = {"items": items, "weights": weights}
+    entry["stamp"] = stamp
+    _corpus_cache[cache_key] = entry
+    _corpus_cache.move_to_end(cache_key)
+    while len(_corpus_cache) > CORPUS_CACHE_SIZE:
+        _corpus_cache.popitem(last=False)
+    return entry
+
+
+def load_items(item_type, language):
+    """Generic function to load words or quotes from a file.
+
+    Parsed files are kept in a small LRU cache and re-read only when the
+    file's mtime changes, so retries and resets don't touch the disk. A
+    compiled corpus next to the .txt file is memory-mapped instead of parsed.
+    """
+    return _load_corpus(item_type, language)["items"]
+
+
+def has_items(item_type, language):
+    """Whether a word or quote file exists and has entries."""
+    return not _load_corpus(item_type, language).get("placeholder", False)
+
+
+def load_sampler(item_type, language):
+    """Returns a cached sampling.Sampler over a word or quote file."""
+    entry = _load_corpus(item_type, language)
+    if "sampler" not in entry:
+        entry["sampler"] = sampling.Sampler(entry["items"], entry["weights"])
+    return entry["sampler"]
+
+
+def load_quote_index(language):
+    """Returns a cached sampling.LengthIndex over a quote file."""
+    entry = _load_corpus("quotes", language)
+    if "length_index" not in entry:
+        entry["length_index"] = sampling.LengthIndex(entry["items"])
+    return entry["length_index"]
+
+
+def load_bigram_index(language):
+    """Returns the adaptive.BigramIndex of a word list.
+
+    The index is built once per corpus version and saved under INDEX_DIR,
+    so later runs load it instead of rescanning the words.
+    """
+    entry = _load_corpus("words", language)
+    if "bigram_index" in entry:
+        return entry["bigram_index"]
+    mtime = entry["stamp"][1] if "stamp" in entry else 0
+    path = os.path.join(INDEX_DIR, language + adaptive.INDEX_EXT)
+    index = None
+    try:
+        index = adaptive.BigramIndex.load(path)
+        if index.source_mtime != mtime or index.word_count != len(entry["items"]):
+            index = None
+    except (FileNotFoundError, ValueError):
+        pass
+    if index is None:
+        index = adaptive.BigramIndex.build(entry["items"], mtime)
+        if "stamp" in entry:
+            try:
+                index.save(path)
+            except OSError:
+                pass
+    entry["bigram_index"] = index
+    return index
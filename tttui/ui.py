@@ -1,17 +1,31 @@
 import curses
 import math
+from . import analytics, game, graph
+from .cells import char_width, text_width
 
 
-def simple_moving_average(data, window_size):
-    if not data or window_size <= 1:
-        return data
-    smoothed = []
-    for i in range(len(data)):
-        start, end = max(0, i - window_size // 2), min(
-            len(data), i + window_size // 2 + 1
-        )
-        smoothed.append(sum(data[start:end]) / len(data[start:end]))
-    return smoothed
+# Attributes for color pairs 0-8, resolved once by init_colors. Until then
+# they use ncurses' COLOR_PAIR encoding, which also serves headless screens.
+_pair_attrs = [n << 8 for n in range(9)]
+_headless = False
+OVERLAY_WIDTH = 36
+HUD_ROW = 3
+
+
+def color_pair(n):
+    return _pair_attrs[n]
+
+
+def set_headless(enabled=True):
+    """Lets the draw functions target fake screens that curses never set up."""
+    global _headless
+    _headless = enabled
+
+
+def _flush(stdscr):
+    stdscr.noutrefresh()
+    if not _headless:
+        curses.doupdate()
 
 
 def init_colors(theme):
@@ -25,6 +39,7 @@ def init_colors(theme):
     curses.init_pair(6, theme["menu_title"][0], theme["menu_title"][1])
     curses.init_pair(7, 240, -1)
     curses.init_pair(8, 238, -1)
+    _pair_attrs[:] = [curses.color_pair(n) for n in range(9)]
 
 
 def display_menu(
@@ -36,7 +51,13 @@ def display_menu(
     pb_summary="",
     settings_summary="",
     descriptions=None,
+    view=None,
 ):
+    """Draws a menu screen.
+
+    If a view dict is passed, it remembers what was drawn; when only the
+    selection moved, just the old and new option rows are redrawn.
+    """
     h, w = stdscr.getmaxyx()
 
     ascii_title = [
@@ -50,7 +71,11 @@ def display_menu(
     group_divider = "─" * 38
 
     menu_width = (
-        max(max(len(line) for line in ascii_title), *(len(opt) + 20 for opt in options))
+        max(
+            max(len(line) for line in ascii_title),
+            *(len(opt) + 20 for opt in options),
+            *(len(desc) + 6 for desc in descriptions or ()),
+        )
         + 8
     )
     menu_height = (
@@ -58,6 +83,26 @@ def display_menu(
     )
     x = (w - menu_width) // 2
     y = (h - menu_height) // 2
+    opt_base_y = y + top_padding + len(ascii_title) + 2 + option_padding
+
+    frame_key = (
+        h,
+        w,
+        title,
+        tuple(options),
+        status_bar,
+        pb_summary,
+        settings_summary,
+        tuple(descriptions or ()),
+    )
+    if view is not None and view.get("frame_key") == frame_key:
+        for i in {view["selected_idx"], selected_idx}:
+            _draw_menu_option(
+                stdscr, opt_base_y + i * 2, x, options[i], i == selected_idx
+            )
+        view["selected_idx"] = selected_idx
+        _flush(stdscr)
+        return
 
     stdscr.erase()
 
@@ -73,7 +118,7 @@ def display_menu(
             y + top_padding + idx,
             x + (menu_width - len(line)) // 2,
             line,
-            curses.A_BOLD | curses.color_pair(6),
+            curses.A_BOLD | color_pair(6),
         )
 
     stdscr.addstr(
@@ -83,24 +128,17 @@ def display_menu(
         curses.A_DIM,
     )
 
-    opt_base_y = y + top_padding + len(ascii_title) + 2 + option_padding
     for i, option in enumerate(options):
         opt_y = opt_base_y + i * 2
-        prefix = "▸ " if i == selected_idx else "  "
-        style = (
-            curses.A_BOLD | curses.color_pair(5)
-            if i == selected_idx
-            else curses.A_NORMAL
-        )
-
-        if i == 3 and len(options) > 4:
+        # Test modes above the line, settings from "language" down.
+        if i and option.startswith("language ") and not descriptions:
             stdscr.addstr(
                 opt_y - 1,
                 x + (menu_width - len(group_divider)) // 2,
                 group_divider,
                 curses.A_DIM,
             )
-        stdscr.addstr(opt_y, x + 6, prefix + option, style)
+        _draw_menu_option(stdscr, opt_y, x, option, i == selected_idx)
         if descriptions and i < len(descriptions) and descriptions[i]:
             stdscr.addstr(opt_y + 1, x + 10, descriptions[i], curses.A_DIM)
 
@@ -119,16 +157,41 @@ def display_menu(
     hint = "↑/↓ move   Enter select   Tab back   Q quit"
     stdscr.addstr(h - 2, (w - len(hint)) // 2, hint, curses.A_DIM)
 
+    if view is not None:
+        view["frame_key"], view["selected_idx"] = frame_key, selected_idx
     stdscr.refresh()
 
 
-def display_test_ui(stdscr, state):
-    """Displays the test UI without the live stats."""
-    h, w = stdscr.getmaxyx()
-    stdscr.erase()
-    cfg = state["config"]
+def _draw_menu_option(stdscr, opt_y, x, option, selected):
+    prefix = "▸ " if selected else "  "
+    style = curses.A_BOLD | color_pair(5) if selected else curses.A_NORMAL
+    stdscr.addstr(opt_y, x + 6, prefix + option, style)
+
+
+def _draw_spans(stdscr, y, cells):
+    """Draws (x, text, attr) cells on row y, one addstr per run of same attr.
+
+    x is in terminal cells, so runs stay joined across wide characters.
+    """
+    run_x, run_attr, run = None, None, []
+    next_x = None
+    for x, text, attr in cells:
+        if run and (attr != run_attr or x != next_x):
+            stdscr.addstr(y, run_x, "".join(run), run_attr)
+            run = []
+        if not run:
+            run_x, run_attr = x, attr
+        run.append(text)
+        next_x = x + text_width(text)
+    if run:
+        stdscr.addstr(y, run_x, "".join(run), run_attr)
 
-    mode_str = f"{cfg['mode']}" + (f" {cfg['value']}" if "value" in cfg else "")
+
+def _test_header(state):
+    cfg = state["config"]
+    mode_str = f"{cfg['mode']}" + (
+        f" {cfg['value']}" if cfg.get("value") is not None else ""
+    )
     header_parts = [mode_str, f"lang: {cfg.get('language', 'english')}"]
 
     if cfg["mode"] == "time":
@@ -137,51 +200,233 @@ def display_test_ui(stdscr, state):
         )
         header_parts.insert(0, time_remaining_str)
 
-    header = " | ".join(header_parts)
-    stdscr.addstr(1, (w - len(header)) // 2, header, curses.A_DIM)
+    return " | ".join(header_parts)
+
+
+def _line_cells(state, line_idx_abs, w):
+    """Yields (text position, x, glyph, attr) for every cell of a wrapped line.
+
+    The space separating the line from the next one is included, so the
+    caret and extra characters typed over it stay visible.
+    """
+    layout = state["layout"]
+    line = layout.lines[line_idx_abs]
+    if layout.has_separator(line_idx_abs):
+        line += " "
+    current_line_idx = state["current_line_idx"]
+    typed = state["typed"]
+    typed_len = len(typed)
+    x = max(0, (w - layout.line_length(line_idx_abs)) // 2)
+    line_start = layout.starts[line_idx_abs]
+
+    for j, char in enumerate(line):
+        abs_char_pos = line_start + j
+        color = color_pair(7 if line_idx_abs < current_line_idx else 3)
+        char_to_display = char
+
+        if abs_char_pos < typed_len:
+            if abs_char_pos in state["extra_chars"]:
+                char_to_display = state["extra_chars"][abs_char_pos]
+                color = color_pair(2)
+                yield abs_char_pos, x, char_to_display, color
+                x += char_width(char_to_display)
+                char_to_display = " "
+
+            color = color_pair(1 if typed.is_correct(abs_char_pos) else 2)
+
+        if abs_char_pos == typed_len:
+            color = (
+                color_pair(4)
+                if state["test_focus"] == "text"
+                else curses.A_NORMAL
+            )
+        yield abs_char_pos, x, char_to_display, color
+        x += char_width(char_to_display)
 
-    lines, current_line_idx = state["lines"], state["current_line_idx"]
+
+def _visible_lines(state, h):
+    """Returns (line index, screen row) pairs for the lines around the caret."""
+    current_line_idx = state["current_line_idx"]
     display_start, display_end = max(0, current_line_idx - 1), min(
-        len(lines), current_line_idx + 2
+        len(state["layout"]), current_line_idx + 2
+    )
+    return [
+        (line_idx_abs, (h // 2) + (i - 1))
+        for i, line_idx_abs in enumerate(range(display_start, display_end))
+    ]
+
+
+def _draw_test_header(stdscr, header, w, y=1):
+    stdscr.move(y, 0)
+    stdscr.clrtoeol()
+    stdscr.addstr(y, (w - len(header)) // 2, header, curses.A_DIM)
+
+
+def _live_stats_line(state):
+    stats = game.live_stats(state)
+    return (
+        f"net {stats['net_wpm']:.0f}  raw {stats['raw_wpm']:.0f}"
+        f"  acc {stats['acc']:.0f}%"
+        f"  last {game.ROLLING_WINDOW:g}s {stats['rolling_wpm']:.0f}"
     )
 
-    for i, line in enumerate(lines[display_start:display_end]):
-        line_idx_abs = display_start + i
-        line_y = (h // 2) + (i - 1)
-        line_len = state["line_char_counts"][line_idx_abs]
-        start_x = (w - line_len) // 2
-        line_offset = 0
-
-        for j, char in enumerate(line):
-            abs_char_pos = sum(len(l) + 1 for l in lines[:line_idx_abs]) + j
-            color = curses.color_pair(7 if line_idx_abs < current_line_idx else 3)
-            char_to_display = char
-
-            if abs_char_pos < len(state["current_text"]):
-                if abs_char_pos in state["extra_chars"]:
-                    char_to_display = state["extra_chars"][abs_char_pos]
-                    color = curses.color_pair(2)
-                    stdscr.addstr(
-                        line_y, start_x + j + line_offset, char_to_display, color
-                    )
-                    line_offset += 1
-                    char_to_display = " "
-
-                color = curses.color_pair(
-                    1
-                    if state["current_text"][abs_char_pos]
-                    == state["target_text"][abs_char_pos]
-                    else 2
-                )
-
-            if abs_char_pos == len(state["current_text"]):
-                color = (
-                    curses.color_pair(4)
-                    if state["test_focus"] == "text"
-                    else curses.A_NORMAL
-                )
-            stdscr.addstr(line_y, start_x + j + line_offset, char_to_display, color)
 
+def _race_bars(opponents, h, w):
+    """Formats (name, progress, is_self) race entries into (row, text, attr)."""
+    first_row, last_row = h // 2 + 3, h - 5
+    bar_width = max(10, min(40, w - 24))
+    shown = list(opponents[: max(0, last_row - first_row + 1)])
+    if shown and not any(is_self for _, _, is_self in shown):
+        shown[-1] = next(entry for entry in opponents if entry[2])
+    bars = []
+    for row, (name, progress, is_self) in zip(range(first_row, last_row + 1), shown):
+        filled = int(min(1.0, progress) * bar_width)
+        text = (
+            f"{name[:12]:>12} {'█' * filled}{'░' * (bar_width - filled)}"
+            f" {min(1.0, progress) * 100:3.0f}%"
+        )
+        bars.append((row, text, color_pair(1) if is_self else color_pair(3)))
+    return tuple(bars)
+
+
+def _draw_race_bars(stdscr, bars, w):
+    for row, text, attr in bars:
+        stdscr.move(row, 0)
+        stdscr.clrtoeol()
+        stdscr.addstr(row, max(0, (w - len(text)) // 2), text[: w - 1], attr)
+
+
+def display_test_ui(stdscr, state, overlay=None, opponents=None):
+    """Displays the test UI, with live stats if the config enables them.
+
+    The first frame after a reset, resize, line change or focus change is a
+    full repaint. Otherwise only the header and the cells between the
+    previous and the current caret position are redrawn. Overlay lines
+    (e.g. profiler output) are drawn right-aligned in the bottom corner,
+    and opponents' (name, progress, is_self) entries as bars under the text.
+    """
+    h, w = stdscr.getmaxyx()
+    header = _test_header(state)
+    hud = _live_stats_line(state) if state["config"].get("live_stats") else None
+    visible = _visible_lines(state, h)
+    bars = _race_bars(opponents, h, w) if opponents else ()
+    caret = len(state["typed"])
+    layout = state["layout"]
+    frame_key = (
+        h,
+        w,
+        tuple(visible),
+        tuple((layout.starts[idx], layout.line_length(idx)) for idx, _ in visible),
+        state["test_focus"],
+        state["selected_command_idx"],
+        len(bars),
+    )
+    view = state.get("view")
+
+    if view is None or view["frame_key"] != frame_key:
+        stdscr.erase()
+        _draw_test_header(stdscr, header, w)
+        if hud:
+            _draw_test_header(stdscr, hud, w, HUD_ROW)
+        for line_idx_abs, line_y in visible:
+            _draw_spans(
+                stdscr,
+                line_y,
+                (
+                    (x, glyph, attr)
+                    for _, x, glyph, attr in _line_cells(state, line_idx_abs, w)
+                    if x + char_width(glyph) < w
+                ),
+            )
+        _draw_race_bars(stdscr, bars, w)
+        _draw_command_bar(stdscr, state, h, w)
+    else:
+        if view["bars"] != bars:
+            _draw_race_bars(
+                stdscr, (bar for bar, old in zip(bars, view["bars"]) if bar != old), w
+            )
+        if view["header"] != header:
+            _draw_test_header(stdscr, header, w)
+        if hud and view["hud"] != hud:
+            _draw_test_header(stdscr, hud, w, HUD_ROW)
+        lo, hi = min(view["caret"], caret), max(view["caret"], caret)
+        for line_idx_abs, line_y in visible:
+            line_start = layout.starts[line_idx_abs]
+            line_end = line_start + len(layout.lines[line_idx_abs])
+            if hi < line_start or lo > line_end:
+                continue
+            _draw_spans(
+                stdscr,
+                line_y,
+                (
+                    (x, glyph, attr)
+                    for pos, x, glyph, attr in _line_cells(state, line_idx_abs, w)
+                    if lo <= pos <= hi and x + char_width(glyph) < w
+                ),
+            )
+
+    for i, line in enumerate(overlay or ()):
+        line = line.rjust(OVERLAY_WIDTH)[-(w - 1) :]
+        stdscr.addstr(h - len(overlay) + i, w - 1 - len(line), line, curses.A_DIM)
+
+    state["view"] = {
+        "frame_key": frame_key,
+        "header": header,
+        "hud": hud,
+        "bars": bars,
+        "caret": caret,
+    }
+    _flush(stdscr)
+
+
+def display_race_screen(stdscr, title, lines, footer=""):
+    """Draws a race lobby, countdown or standings screen."""
+    h, w = stdscr.getmaxyx()
+    stdscr.erase()
+    stdscr.addstr(
+        2,
+        max(0, (w - len(title)) // 2),
+        title[: w - 1],
+        color_pair(6) | curses.A_BOLD,
+    )
+    for i, line in enumerate(lines[: max(0, h - 8)]):
+        stdscr.addstr(4 + i, max(0, (w - len(line)) // 2), line[: w - 1])
+    if footer:
+        stdscr.addstr(
+            h - 2, max(0, (w - len(footer)) // 2), footer[: w - 1], curses.A_DIM
+        )
+    _flush(stdscr)
+
+
+def prompt(stdscr, title, label, default=""):
+    """Reads a line of text; returns it, or None if Esc was pressed."""
+    text = default
+    curses.curs_set(1)
+    try:
+        while True:
+            display_race_screen(
+                stdscr, title, [label, "", f"> {text}"], "enter: ok   esc: cancel"
+            )
+            h, w = stdscr.getmaxyx()
+            line = f"> {text}"
+            stdscr.move(6, min(w - 1, max(0, (w - len(line)) // 2) + len(line)))
+            try:
+                key = stdscr.get_wch()
+            except curses.error:
+                continue
+            if key in ("\n", "\r", curses.KEY_ENTER):
+                return text
+            if key == "\x1b":
+                return None
+            if key in ("\x7f", "\b", curses.KEY_BACKSPACE):
+                text = text[:-1]
+            elif isinstance(key, str) and key.isprintable():
+                text += key
+    finally:
+        curses.curs_set(0)
+
+
+def _draw_command_bar(stdscr, state, h, w):
     command_bar_y = h - 3
     command_options = state["command_options"]
     total_bar_width = sum(len(opt) for opt in command_options) + (
@@ -191,84 +436,79 @@ def display_test_ui(stdscr, state):
     for i, option in enumerate(command_options):
         style = curses.A_NORMAL
         if state["test_focus"] == "command" and i == state["selected_command_idx"]:
-            style = curses.color_pair(5)
+            style = color_pair(5)
         stdscr.addstr(command_bar_y, command_bar_x, f"  {option}  ", style)
         command_bar_x += len(option) + 4
-    stdscr.refresh()
 
 
-def _draw_wpm_graph(stdscr, y, x, width, height, history, duration):
-    if not history:
-        return
-    smoothing_window = max(1, len(history) // 6)
-    smoothed_history = simple_moving_average(history, smoothing_window)
+# (results key, label, color pair) of each graph series, drawn bottom-up so
+# the net WPM line ends up on top.
+GRAPH_SERIES = (
+    ("pb_history", "pb", 6),
+    ("wpm_history", "raw", 7),
+    ("net_history", "net", 1),
+)
+_graph_cache = {"results": None, "key": None, "ops": None}
+
+
+def _render_wpm_graph(width, height, results):
+    """Rasterizes the results' WPM series into (dy, dx, text, attr) draw ops."""
     y_axis_width = 4
     x_axis_height = 1
-    graph_area_width = (width - y_axis_width) * 2
-    graph_area_height = (height - x_axis_height) * 4
-    canvas = [
-        [False for _ in range(graph_area_width)] for _ in range(graph_area_height)
-    ]
-    max_wpm = max(smoothed_history) if smoothed_history else 0
+    series = []
+    for key, label, pair in GRAPH_SERIES:
+        values = results.get(key)
+        if values:
+            window = max(1, len(values) // 6)
+            series.append((analytics.moving_average(values, window), label, pair))
+    if not series:
+        return []
+    max_wpm = max(max(values) for values, _, _ in series)
     y_max = math.ceil(max_wpm / 10.0) * 10 if max_wpm > 0 else 50
-    grid_line_char = "·"
-    grid_line_style = curses.color_pair(8) | curses.A_DIM
+
+    ops = []
+    grid_style = color_pair(8) | curses.A_DIM
+    grid_row = "".join(
+        "·" if c % 2 == 0 else " " for c in range(width - y_axis_width)
+    )
     num_grid_lines = 6
     for i in range(num_grid_lines + 1):
-        line_y = y + int(i * ((height - x_axis_height - 1) / num_grid_lines))
+        line_y = int(i * ((height - x_axis_height - 1) / num_grid_lines))
         wpm_label = int(y_max * (1 - i / num_grid_lines))
-        stdscr.addstr(line_y, x, f"{wpm_label:<{y_axis_width-1}}")
-        for c in range(width - y_axis_width):
-            if c % 2 == 0:
-                stdscr.addstr(
-                    line_y, x + y_axis_width + c, grid_line_char, grid_line_style
-                )
-    for i in range(graph_area_width - 1):
-        idx1 = int(i * (len(smoothed_history) / graph_area_width))
-        idx2 = int((i + 1) * (len(smoothed_history) / graph_area_width))
-        if idx2 >= len(smoothed_history):
-            idx2 = len(smoothed_history) - 1
-        y1 = (
-            int((smoothed_history[idx1] / y_max) * (graph_area_height - 1))
-            if y_max > 0
-            else 0
+        ops.append((line_y, 0, f"{wpm_label:<{y_axis_width-1}}", 0))
+        ops.append((line_y, y_axis_width, grid_row, grid_style))
+
+    canvas = graph.Canvas(width - y_axis_width, height - x_axis_height)
+    for series_id, (values, _, _) in enumerate(series, 1):
+        canvas.plot(values, y_max, series_id)
+    attrs = [0] + [color_pair(pair) for _, _, pair in series]
+    for r, row in enumerate(canvas.spans()):
+        for col, text, series_id in row:
+            ops.append((r, y_axis_width + col, text, attrs[series_id]))
+
+    axis_y = height - x_axis_height
+    end_time_str = f"{int(results['time'])}s"
+    ops.append((axis_y, y_axis_width, "0s", curses.A_DIM))
+    ops.append((axis_y, width - len(end_time_str), end_time_str, curses.A_DIM))
+    if len(series) > 1:
+        legend_x = y_axis_width + (width - y_axis_width) // 2
+        legend_x -= sum(len(label) + 3 for _, label, _ in series) // 2
+        for _, label, pair in reversed(series):
+            ops.append((axis_y, legend_x, "━ " + label, color_pair(pair)))
+            legend_x += len(label) + 3
+    return ops
+
+
+def _draw_wpm_graph(stdscr, y, x, width, height, results):
+    """Draws the WPM graph, rasterizing it only once per result and size."""
+    cache = _graph_cache
+    key = (width, height)
+    if cache["results"] is not results or cache["key"] != key:
+        cache.update(
+            results=results, key=key, ops=_render_wpm_graph(width, height, results)
         )
-        y2 = (
-            int((smoothed_history[idx2] / y_max) * (graph_area_height - 1))
-            if y_max > 0
-            else 0
-        )
-        dx, dy = 1, y2 - y1
-        steps = max(abs(dx), abs(dy))
-        steps = 1 if steps == 0 else steps
-        for step in range(steps + 1):
-            px, py = i + int(step * dx / steps), y1 + int(step * dy / steps)
-            if 0 <= py < graph_area_height:
-                canvas[py][px] = True
-    for r in range(height - x_axis_height):
-        for c in range(width - y_axis_width):
-            dots = [canvas[r * 4 + j][c * 2 + k] for j in range(4) for k in range(2)]
-            braille_code = 0x2800
-            dot_map = [0x01, 0x02, 0x04, 0x40, 0x08, 0x10, 0x20, 0x80]
-            for i, dot in enumerate(dots):
-                if dot:
-                    braille_code += dot_map[i]
-            if braille_code != 0x2800:
-                stdscr.addstr(
-                    y + (height - x_axis_height - 1 - r),
-                    x + y_axis_width + c,
-                    chr(braille_code),
-                    curses.color_pair(1),
-                )
-    int_duration = int(duration)
-    end_time_str = f"{int_duration}s"
-    stdscr.addstr(
-        y + height - x_axis_height,
-        x + width - len(end_time_str),
-        end_time_str,
-        curses.A_DIM,
-    )
-    stdscr.addstr(y + height - x_axis_height, x + y_axis_width, "0s", curses.A_DIM)
+    for dy, dx, text, attr in cache["ops"]:
+        stdscr.addstr(y + dy, x + dx, text, attr)
 
 
 def display_results(stdscr, state):
@@ -278,7 +518,7 @@ def display_results(stdscr, state):
     wpm_str = f"{results['net_wpm']:.2f} WPM"
     acc_str = f"{results['acc']:.2f}% acc"
     stdscr.addstr(
-        1, (w - len(wpm_str)) // 2, wpm_str, curses.color_pair(1) | curses.A_BOLD
+        1, (w - len(wpm_str)) // 2, wpm_str, color_pair(1) | curses.A_BOLD
     )
     stdscr.addstr(2, (w - len(acc_str)) // 2, acc_str)
     y_offset = 4
@@ -288,7 +528,7 @@ def display_results(stdscr, state):
             y_offset,
             (w - len(pb_title)) // 2,
             pb_title,
-            curses.color_pair(1) | curses.A_BOLD,
+            color_pair(1) | curses.A_BOLD,
         )
         y_offset += 2
     box_width = 50
@@ -312,7 +552,10 @@ def display_results(stdscr, state):
     )
     stdscr.addstr(stats_y + 2, col1_x, f"{'time':<12}{results['time']:.2f}s")
     stdscr.addstr(stats_y + 2, col2_x, f"{'chars':<12}{results['char_stats']}")
-    stdscr.addstr(stats_y + 3, col1_x, f"{'test':<12}{test_mode_str}")
+    test_cell = f"{'test':<12}{test_mode_str}"
+    if len(test_cell) >= col2_x - col1_x:
+        test_cell = f"test {test_mode_str}"[: col2_x - col1_x - 1]
+    stdscr.addstr(stats_y + 3, col1_x, test_cell)
     stdscr.addstr(stats_y + 3, col2_x, f"{'language':<12}{cfg['language']}")
     graph_h = 14
     graph_w = 70
@@ -324,8 +567,7 @@ def display_results(stdscr, state):
         graph_x,
         graph_w,
         graph_h,
-        results["wpm_history"],
-        results["time"],
+        results,
     )
     msg = "Press 'Enter' to retry, 'Tab' for menu, 'q' to quit."
     stdscr.addstr(h - 2, (w - len(msg)) // 2, msg)